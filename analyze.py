@@ -0,0 +1,361 @@
+import argparse
+import collections
+import concurrent.futures
+import itertools
+import json
+import math
+import os
+import sys
+import time
+from colorama import Fore, Style
+
+import engine
+from engine import Game
+
+
+def score_positions(positions: list[tuple[str, bool]], options: dict) -> list[dict]:
+    """
+    Scores positions in a worker process: the number of candidates and, if asked, the engine's best guess.
+
+    The worker keeps one game around and the positions are sorted, so a position extending the previous
+    one only plays the new moves.
+
+    Args:
+        positions (list[tuple[str, bool]]): The positions, as PWN strings ("" for the blank position),
+            each with whether to search it for the best guess.
+        options (dict): Game attributes to set, as returned by Game.get_options.
+
+    Returns:
+        list[dict]: For each position, its candidate count, plus the best guess and the best guess's
+        entropy for the searched ones. A position that could not be scored gets its error instead, so
+        one bad game does not fail the whole batch.
+    """
+    game = engine.get_worker_game(options)
+
+    results = []
+    for pwn, search in positions:
+        try:
+            results.append(score_position(game, pwn, search))
+        except Exception as e:
+            game.clean()  # The failed move may have been played halfway
+            results.append({"error": f"{type(e).__name__}: {e}"})
+
+    return results
+
+
+def score_position(game: Game, pwn: str, search: bool) -> dict:
+    """Scores one position for score_positions."""
+    patterns, guesses = game.decode_pwn(pwn)
+    game.set_position(patterns, guesses)
+
+    # Count what the engine scores against, without the fallback to every word once none is left
+    if game.use_answer_pool:
+        candidates = len(game.get_answer_pool())
+    else:
+        candidates = len(game.candidates)
+
+    score = {"candidates": candidates}
+    if search:
+        best_guess = game.best_guess() if candidates else None
+        score["best_guess"] = best_guess
+        score["best_entropy"] = (
+            game.calculate_entropy(best_guess, game.get_possible_words())
+            if best_guess
+            else None
+        )
+    return score
+
+
+def read_games(lines):
+    """
+    Parses finished games from PWN lines, skipping blank lines and reporting invalid ones.
+
+    Guesses are case folded by Game.decode_pwn; a guess with anything but the letters a-z is invalid.
+
+    Yields:
+        tuple[int, list[str], list[str]]: The line number, patterns and guesses of each game, or the
+        line number and None, None for an invalid line.
+    """
+    decoder = Game()
+
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+
+        patterns, guesses = decoder.decode_pwn(line)
+        valid = guesses and all(
+            engine.GUESS_PATTERN.fullmatch(guess)
+            and len(pattern) == 5
+            and set(pattern) <= set("gy-")
+            for guess, pattern in zip(guesses, patterns)
+        )
+        if valid:
+            yield number, patterns, guesses
+        else:
+            yield number, None, None
+
+
+def get_positions(game: Game, patterns: list[str], guesses: list[str]) -> list[str]:
+    """
+    Returns the PWN of the position before each move of a game, followed by the final position.
+    """
+    return [game.encode_pwn(patterns[:i], guesses[:i]) for i in range(len(guesses) + 1)]
+
+
+def get_needs(positions: list[str], patterns: list[str]) -> dict:
+    """
+    Returns what grade_game needs of each position of a game: True for the positions before a move,
+    which are searched for the best guess, and False for the final one, whose candidates are only
+    counted. The final position of a solved game is not needed at all.
+    """
+    needs = {}
+    if patterns[-1] != "ggggg":
+        needs[positions[-1]] = False
+    for pwn in positions[:-1]:
+        needs[pwn] = True
+    return needs
+
+
+def grade_game(
+    number: int,
+    patterns: list[str],
+    guesses: list[str],
+    positions: list[str],
+    scores: dict,
+) -> list[dict]:
+    """
+    Builds the report of each move of a game from the scores of its positions.
+
+    Args:
+        number (int): The line number of the game.
+        patterns (list[str]): The patterns of the game.
+        guesses (list[str]): The guesses of the game.
+        positions (list[str]): The positions of the game, as returned by get_positions.
+        scores (dict): The scores of positions, keyed by PWN.
+
+    Returns:
+        list[dict]: One report per move.
+    """
+    reports = []
+
+    for ply, (guess, pattern) in enumerate(zip(guesses, patterns)):
+        before = scores[positions[ply]]
+        after = 1 if pattern == "ggggg" else scores[positions[ply + 1]]["candidates"]
+
+        reports.append(
+            {
+                "game": number,
+                "ply": ply + 1,
+                "guess": guess,
+                "pattern": pattern,
+                "candidates_before": before["candidates"],
+                "candidates_after": after,
+                "entropy_gained": (
+                    math.log2(before["candidates"] / after)
+                    if before["candidates"] and after
+                    else None
+                ),
+                "best_guess": before["best_guess"],
+                "best_entropy": before["best_entropy"],
+            }
+        )
+
+    return reports
+
+
+class ScoreCache:
+    """The scores of recently seen positions, keyed by PWN, dropping the least recently used ones."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.scores = collections.OrderedDict()
+
+    def get(self, pwn: str) -> dict | None:
+        score = self.scores.get(pwn)
+        if score is not None:
+            self.scores.move_to_end(pwn)
+        return score
+
+    def put(self, pwn: str, score: dict):
+        self.scores[pwn] = score
+        self.scores.move_to_end(pwn)
+        while len(self.scores) > self.max_size:
+            self.scores.popitem(last=False)
+
+
+def analyze_games(
+    games,
+    options: dict,
+    workers: int | None = None,
+    chunk_size: int = 256,
+    batch_size: int = 64,
+    cache_size: int = 100_000,
+    counts: collections.Counter | None = None,
+):
+    """
+    Grades a stream of games, scoring their positions in worker processes.
+
+    Games are read a chunk at a time and at most two chunks per worker are in flight, so memory stays
+    bounded however many games there are. Positions are deduplicated against the recently scored ones
+    and the ones in flight, so a position shared by many games is scored once. Only the positions before
+    a move are searched for the best guess; the final ones are only counted.
+
+    Args:
+        games: The games, as yielded by read_games.
+        options (dict): Game attributes to set on the workers' games.
+        workers (int | None): The number of worker processes, all cores if None.
+        chunk_size (int): The number of games read at a time.
+        batch_size (int): The number of positions sent to a worker at a time.
+        cache_size (int): The number of position scores kept to deduplicate positions.
+        counts (collections.Counter | None): Receives the number of games, invalid games, games whose
+            positions could not be scored, moves, positions scored and positions reused.
+
+    Yields:
+        dict: The report of each move, in the order of the games.
+    """
+    counts = counts if counts is not None else collections.Counter()
+    workers = workers or os.cpu_count() or 1
+    game = Game()
+    cache = ScoreCache(cache_size)
+    # PWN -> (future, index in its batch, searched) of positions being scored
+    pending = {}
+    in_flight = collections.deque()
+
+    def submit(chunk: list[tuple]) -> dict:
+        # Every position of the chunk, mapped to its score or to where its score will come from
+        needs = {}
+        used = 0
+        for _, patterns, guesses in chunk:
+            if guesses is None:
+                continue
+            game_needs = get_needs(get_positions(game, patterns, guesses), patterns)
+            used += len(game_needs)
+            for pwn, search in game_needs.items():
+                needs[pwn] = needs.get(pwn, False) or search
+
+        # A counted position does not do for one that has to be searched
+        sources = {}
+        new = []
+        for pwn, search in needs.items():
+            score = cache.get(pwn)
+            if score is not None and (not search or "best_guess" in score):
+                sources[pwn] = score
+            elif pwn in pending and (not search or pending[pwn][2]):
+                sources[pwn] = pending[pwn]
+            else:
+                new.append((pwn, search))
+
+        new.sort()  # Positions extending each other end up in the same batch, one after the other
+        for start in range(0, len(new), batch_size):
+            batch = new[start : start + batch_size]
+            future = executor.submit(score_positions, batch, options)
+            for i, (pwn, search) in enumerate(batch):
+                sources[pwn] = pending[pwn] = (future, i, search)
+        counts["positions"] += len(new)
+        counts["reused"] += used - len(new)
+
+        return sources
+
+    def finish(chunk: list[tuple], sources: dict):
+        scores = {}
+        for pwn, source in sources.items():
+            if isinstance(source, tuple):
+                future, i, _ = source
+                scores[pwn] = future.result()[i]
+                if pending.get(pwn) is source:
+                    del pending[pwn]
+                    cache.put(pwn, scores[pwn])
+            else:
+                scores[pwn] = source
+
+        for number, patterns, guesses in chunk:
+            counts["games"] += 1
+            if guesses is None:
+                counts["invalid"] += 1
+                continue
+            positions = get_positions(game, patterns, guesses)
+            if any("error" in scores[pwn] for pwn in get_needs(positions, patterns)):
+                counts["failed"] += 1
+                continue
+            for report in grade_game(number, patterns, guesses, positions, scores):
+                counts["moves"] += 1
+                yield report
+
+    games = iter(games)
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=engine.get_mp_context(),
+        initializer=engine.get_pattern_matrix,
+    ) as executor:
+        while chunk := list(itertools.islice(games, chunk_size)):
+            in_flight.append((chunk, submit(chunk)))
+            if len(in_flight) > 2 * workers:
+                yield from finish(*in_flight.popleft())
+
+        while in_flight:
+            yield from finish(*in_flight.popleft())
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Grade finished games read as PWN lines, one report per move as JSON lines."
+    )
+    parser.add_argument("input", help="file of PWN lines, - for stdin")
+    parser.add_argument(
+        "--output", default="-", help="file to write the reports to (default stdout)"
+    )
+    parser.add_argument("--workers", type=int, help="worker processes (default: cores)")
+    parser.add_argument(
+        "--set",
+        action="append",
+        default=[],
+        metavar="NAME=VALUE",
+        help="engine setting, as with the UWI set command (repeatable)",
+    )
+    args = parser.parse_args()
+
+    game = Game()
+    game.debug = False
+    for setting in args.set:
+        name, _, value = setting.partition("=")
+        if not game.set_option(name, value):
+            parser.error(f"invalid setting: {setting}")
+
+    engine.preload_tables()
+
+    counts = collections.Counter()
+    start = time.time()
+    source = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    output = (
+        sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    )
+    try:
+        for report in analyze_games(
+            read_games(source), game.get_options(), args.workers, counts=counts
+        ):
+            output.write(json.dumps(report) + "\n")
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if output is not sys.stdout:
+            output.close()
+
+    print(
+        f"{Fore.GREEN}Graded {counts['moves']} moves of {counts['games'] - counts['invalid'] - counts['failed']} games, scoring {counts['positions']} positions ({counts['reused']} reused) in {time.time() - start:.1f}s{Style.RESET_ALL}",
+        file=sys.stderr,
+    )
+    if counts["invalid"]:
+        print(
+            f"{Fore.RED}Skipped {counts['invalid']} invalid lines{Style.RESET_ALL}",
+            file=sys.stderr,
+        )
+    if counts["failed"]:
+        print(
+            f"{Fore.RED}Skipped {counts['failed']} games whose positions could not be scored{Style.RESET_ALL}",
+            file=sys.stderr,
+        )
+
+
+if __name__ == "__main__":
+    main()
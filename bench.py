@@ -0,0 +1,434 @@
+import argparse
+import json
+import platform
+import random
+import time
+from collections import Counter
+from colorama import Fore, Style
+
+import engine
+from engine import Game, get_answer, np
+
+BENCH_VERSION = 3
+
+
+def measure(func, repeat: int = 5, min_time: float = 0.2) -> float:
+    """
+    Times func like timeit, keeping the fastest of the repeats since slower runs only add noise.
+
+    Args:
+        func: The function to time, called without arguments.
+        repeat (int): The number of repeats.
+        min_time (float): The minimum duration of a repeat, reached by calling func several times.
+
+    Returns:
+        float: The fastest time of one call, in seconds.
+    """
+    # Like timeit.Timer.autorange, call func more times per repeat until a repeat is long enough to time
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        if time.perf_counter() - start >= min_time:
+            break
+        number *= 2
+
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        best = min(best, time.perf_counter() - start)
+    return best / number
+
+
+def new_game() -> Game:
+    """Returns a game that searches every position instead of looking it up or reusing earlier rankings."""
+    game = Game()
+    game.debug = False
+    game.use_solution_tree = False
+    game.use_opening_book = False
+    game.ranking_cache = None
+    return game
+
+
+def get_positions(seed: int, games: int = 4, plies: int = 4) -> list[list[tuple]]:
+    """
+    Builds fixed positions to benchmark, independent of the engine's own choices.
+
+    Each game plays the starting word and then random candidates against a random answer, so later
+    plies have smaller candidate sets.
+
+    Returns:
+        list[list[tuple]]: For each ply, the (patterns, guesses) of the positions with that many guesses.
+    """
+    rng = random.Random(seed)
+    positions = [[] for _ in range(plies)]
+
+    for target in rng.sample(engine.answers, games):
+        game = new_game()
+        for ply in range(plies):
+            positions[ply].append((list(game.patterns), list(game.guesses)))
+            if ply == plies - 1:
+                break
+
+            guess = game.starting_word if ply == 0 else rng.choice(game.candidates)
+            game.play(guess, get_answer(guess, target))
+            if len(game.candidates) <= 1:
+                break
+
+    return positions
+
+
+def bench_get_answer(seed: int, repeat: int) -> dict:
+    rng = random.Random(seed)
+    pairs = [
+        (rng.choice(engine.possible_guesses), rng.choice(engine.answers))
+        for _ in range(10000)
+    ]
+
+    def run():
+        for guess, target in pairs:
+            get_answer(guess, target)
+
+    return {"seconds": measure(run, repeat=repeat) / len(pairs), "calls": len(pairs)}
+
+
+def bench_get_words_from_pattern(positions: list[tuple], repeat: int) -> dict:
+    game = new_game()
+    sizes = [len(game.get_words_from_pattern(*position)) for position in positions]
+
+    def run():
+        for patterns, guesses in positions:
+            game.get_words_from_pattern(patterns, guesses)
+
+    return {
+        "seconds": measure(run, repeat=repeat) / len(positions),
+        "calls": len(positions),
+        "candidates": sum(sizes) / len(sizes),
+    }
+
+
+def bench_calculate_entropy(
+    positions: list[tuple], seed: int, repeat: int, use_pattern_matrix: bool
+) -> dict:
+    rng = random.Random(seed)
+    guesses = rng.sample(engine.possible_guesses, 50)
+
+    games = []
+    for patterns, guesses_played in positions:
+        game = new_game()
+        game.use_pattern_matrix = use_pattern_matrix
+        game.play_all(guesses_played, patterns)
+        if game.candidates:
+            games.append(game)
+
+    def run():
+        for game in games:
+            game.entropy_cache = {}
+            for guess in guesses:
+                game.calculate_entropy(guess, game.candidates)
+
+    calls = len(games) * len(guesses)
+    return {
+        "seconds": measure(run, repeat=repeat) / calls,
+        "calls": calls,
+        "candidates": sum(len(game.candidates) for game in games) / len(games),
+    }
+
+
+def bench_best_guess(positions: list[tuple], repeat: int) -> dict:
+    games = []
+    for patterns, guesses in positions:
+        game = new_game()
+        game.play_all(guesses, patterns)
+        games.append(game)
+
+    def run():
+        for game in games:
+            game.entropy_cache = {}
+            game.best_guess()
+
+    return {
+        "seconds": measure(run, repeat=repeat) / len(games),
+        "calls": len(games),
+        "candidates": sum(len(game.candidates) for game in games) / len(games),
+    }
+
+
+def bench_sampling(positions: list[tuple], seed: int, repeat: int) -> dict:
+    """
+    Ranks positions at turn 2 and later exactly and with sampled entropies at several error bounds, with
+    the candidates and with the answer pool, reporting the time and the error of the estimates.
+    """
+    matrix = engine.get_pattern_matrix()
+    results = {}
+
+    for mode, use_answer_pool in (("candidates", False), ("answer_pool", True)):
+        games = []
+        for patterns, guesses in positions:
+            game = new_game()
+            game.use_answer_pool = use_answer_pool
+            game.play_all(guesses, patterns)
+            if len(game.get_possible_words()) > 2:
+                games.append(game)
+
+        def run():
+            for game in games:
+                game.rank_guesses_vectorized(matrix, game.get_guess_pool())
+
+        for game in games:
+            game.use_sampling = False
+        exact_scores = [
+            game.rank_guesses_vectorized(matrix, game.get_guess_pool())
+            for game in games
+        ]
+        results[f"rank_guesses_vectorized/{mode}/exact"] = {
+            "seconds": measure(run, repeat) / len(games),
+            "calls": len(games),
+            "candidates": sum(len(game.get_possible_words()) for game in games)
+            / len(games),
+        }
+
+        for error in (0.1, 0.25, 0.5):
+            errors = []
+            for game in games:
+                game.use_sampling = True
+                game.sample_error = error
+                game.sample_seed = seed
+
+                # The estimates of the best guesses, where their error matters
+                answer_ids = game.get_answer_ids(game.get_possible_words())
+                size = engine.get_sample_size(len(answer_ids), error)
+                if 2 * size > len(answer_ids):
+                    continue
+                guess_ids = game.get_answer_ids(game.get_guess_pool())
+                exact = engine.get_entropies(matrix, guess_ids, answer_ids)
+                estimates = engine.get_entropies(
+                    matrix,
+                    guess_ids,
+                    engine.sample_answer_ids(answer_ids, size, seed),
+                    population=len(answer_ids),
+                )
+                top = np.argsort(-exact)[: game.sample_top_k]
+                errors.append(np.abs(estimates - exact)[top])
+
+            same_best = sum(
+                scores.argmax()
+                == game.rank_guesses_vectorized(matrix, game.get_guess_pool()).argmax()
+                for game, scores in zip(games, exact_scores)
+            )
+            sampled = len(errors)
+            errors = np.concatenate(errors) if errors else None
+
+            results[f"rank_guesses_vectorized/{mode}/sampled{error}"] = {
+                "seconds": measure(run, repeat) / len(games),
+                "calls": len(games),
+                "sampled": sampled,
+                "mean_error": float(errors.mean()) if sampled else None,
+                "max_error": float(errors.max()) if sampled else None,
+                "same_best": int(same_best),
+            }
+
+    return results
+
+
+def bench_solve(seed: int, sample: int) -> dict:
+    """
+    Solves a fixed sample of answers through the full solve loop, searching every position.
+
+    The WSE counts failed targets as engine.get_wse does.
+    """
+    targets = random.Random(seed).sample(engine.answers, sample)
+    settings = {"use_solution_tree": False, "use_opening_book": False}
+
+    engine.ranking_cache.clear()
+    start = time.perf_counter()
+    results = engine.solve_many(targets, settings=settings)
+    seconds = time.perf_counter() - start
+
+    histogram = Counter(len(guesses) for guesses in results.values() if guesses)
+    solved = sum(histogram.values())
+
+    return {
+        "seconds": seconds / len(targets),
+        "calls": len(targets),
+        "solved": solved,
+        "wse": engine.get_wse(results),
+        "histogram": {count: histogram[count] for count in sorted(histogram)},
+    }
+
+
+def run_benchmarks(
+    seed: int = 0, repeat: int = 5, sample: int = 100, macro: bool = True
+) -> dict:
+    """
+    Runs the micro benchmarks and, unless disabled, the macro benchmark.
+
+    Args:
+        seed (int): The seed of every random choice, so runs with the same seed measure the same work.
+        repeat (int): The number of repeats of each micro benchmark.
+        sample (int): The number of answers solved by the macro benchmark.
+        macro (bool): Whether to run the macro benchmark.
+
+    Returns:
+        dict: The run's settings and a result per benchmark, with "seconds" being the time of one call.
+    """
+    # Load the tables first so loading them is not measured
+    engine.preload_tables()
+
+    positions = get_positions(seed)
+    results = {"get_answer": bench_get_answer(seed, repeat)}
+
+    for ply, ply_positions in enumerate(positions):
+        results[f"get_words_from_pattern/ply{ply}"] = bench_get_words_from_pattern(
+            ply_positions, repeat
+        )
+
+    for ply, ply_positions in enumerate(positions[1:], 1):
+        results[f"calculate_entropy/matrix/ply{ply}"] = bench_calculate_entropy(
+            ply_positions, seed, repeat, True
+        )
+        results[f"calculate_entropy/get_answer/ply{ply}"] = bench_calculate_entropy(
+            ply_positions, seed, repeat, False
+        )
+
+    for ply, ply_positions in enumerate(positions):
+        results[f"best_guess/turn{ply + 1}"] = bench_best_guess(ply_positions, repeat)
+
+    if engine.get_pattern_matrix() is not None:
+        results.update(
+            bench_sampling([p for ply in positions[1:] for p in ply], seed, repeat)
+        )
+
+    if macro:
+        results["solve"] = bench_solve(seed, sample)
+
+    return {
+        "version": BENCH_VERSION,
+        "seed": seed,
+        "repeat": repeat,
+        "sample": sample if macro else None,
+        "word_data": engine.get_word_data_hash(),
+        "python": platform.python_version(),
+        "numpy": engine.np.__version__ if engine.np is not None else None,
+        "results": results,
+    }
+
+
+def format_error(result: dict) -> str:
+    """Formats the accuracy of an approximate benchmark, or nothing for exact ones."""
+    if "sampled" not in result:
+        return ""
+    if not result["sampled"]:
+        return f"  (sampled 0/{result['calls']} positions)"
+    return f"  (sampled {result['sampled']}/{result['calls']} positions, mean error {result['mean_error']:.4f} bits, max {result['max_error']:.4f}, same best: {result['same_best']}/{result['calls']})"
+
+
+def compare(run: dict, baseline: dict, threshold: float = 0.25) -> list[str]:
+    """
+    Compares a run with a baseline, printing the change of every benchmark.
+
+    Args:
+        run (dict): The results of run_benchmarks.
+        baseline (dict): Earlier results of run_benchmarks.
+        threshold (float): The relative slowdown above which a benchmark counts as a regression.
+
+    Returns:
+        list[str]: The names of the benchmarks that regressed, in time or in WSE.
+    """
+    if run["seed"] != baseline["seed"] or run["word_data"] != baseline["word_data"]:
+        print(
+            f"{Fore.YELLOW}Warning: the baseline was run with another seed or other word data{Style.RESET_ALL}"
+        )
+    if run["version"] != baseline.get("version"):
+        print(
+            f"{Fore.YELLOW}Warning: the baseline was run with another version of the benchmarks{Style.RESET_ALL}"
+        )
+
+    regressions = []
+    for name, result in run["results"].items():
+        old = baseline["results"].get(name)
+        if old is None:
+            print(
+                f"{name:<48} {result['seconds'] * 1e3:>12.4f} ms  (new){format_error(result)}"
+            )
+            continue
+
+        change = result["seconds"] / old["seconds"] - 1 if old["seconds"] else 0.0
+        if change > threshold:
+            color = Fore.RED
+            regressions.append(name)
+        elif change < -threshold:
+            color = Fore.GREEN
+        else:
+            color = ""
+        print(
+            f"{name:<48} {result['seconds'] * 1e3:>12.4f} ms  {color}{change:+.1%}{Style.RESET_ALL}{format_error(result)}"
+        )
+
+        if "wse" in result and result["wse"] != old.get("wse"):
+            worse = (result["wse"] or float("inf")) > (old.get("wse") or float("inf"))
+            if worse or result["solved"] < old.get("solved", 0):
+                regressions.append(name + "/wse")
+            print(
+                f"{'':<48} {(Fore.RED if worse else Fore.GREEN)}WSE {old.get('wse')} -> {result['wse']}, solved {old.get('solved')} -> {result['solved']}{Style.RESET_ALL}"
+            )
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the engine with fixed seeds and compare against a baseline."
+    )
+    parser.add_argument("--seed", type=int, default=0, help="random seed (default 0)")
+    parser.add_argument(
+        "--repeat", type=int, default=5, help="repeats per micro benchmark (default 5)"
+    )
+    parser.add_argument(
+        "--sample",
+        type=int,
+        default=100,
+        help="answers solved by the macro benchmark (default 100)",
+    )
+    parser.add_argument(
+        "--no-macro", action="store_true", help="only run the micro benchmarks"
+    )
+    parser.add_argument(
+        "--output", default="bench.json", help="file to write the results to"
+    )
+    parser.add_argument("--baseline", help="results of an earlier run to compare with")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.25,
+        help="slowdown flagged as a regression (default 0.25 for 25%%)",
+    )
+    args = parser.parse_args()
+
+    run = run_benchmarks(args.seed, args.repeat, args.sample, not args.no_macro)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(run, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(run, baseline, args.threshold)
+        if regressions:
+            print(f"{Fore.RED}Regressions: {', '.join(regressions)}{Style.RESET_ALL}")
+            raise SystemExit(1)
+        print(f"{Fore.GREEN}No regressions{Style.RESET_ALL}")
+    else:
+        for name, result in run["results"].items():
+            print(
+                f"{name:<48} {result['seconds'] * 1e3:>12.4f} ms{format_error(result)}"
+            )
+
+    print(f"{Fore.GREEN}Results written to '{args.output}'{Style.RESET_ALL}")
+
+
+if __name__ == "__main__":
+    main()
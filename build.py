@@ -0,0 +1,116 @@
+import argparse
+import json
+import os
+import time
+from colorama import Fore, Style
+
+import engine
+
+
+def build_matrix(args):
+    """Build (or check) the pattern matrix used for vectorized scoring."""
+    if engine.np is None:
+        print(
+            f"{Fore.RED}NumPy is required to build the pattern matrix{Style.RESET_ALL}"
+        )
+        return
+
+    if args.rebuild and os.path.exists(engine.PATTERN_MATRIX_FILE):
+        os.remove(engine.PATTERN_MATRIX_FILE)
+
+    matrix = engine.get_pattern_matrix()
+    print(
+        f"{Fore.GREEN}Pattern matrix ready: {matrix.shape[0]}x{matrix.shape[1]} in '{engine.PATTERN_MATRIX_FILE}'{Style.RESET_ALL}"
+    )
+
+
+def build_bundle(args):
+    """Compile the word lists and frequencies into the binary bundle loaded by the engine."""
+    if args.rebuild and os.path.exists(engine.WORD_BUNDLE_FILE):
+        os.remove(engine.WORD_BUNDLE_FILE)
+
+    engine.load_word_data()
+    print(
+        f"{Fore.GREEN}Word bundle ready: {len(engine.possible_guesses)} guesses, {len(engine.answers)} answers and {len(engine.freqs)} frequencies in '{engine.WORD_BUNDLE_FILE}'{Style.RESET_ALL}"
+    )
+
+
+def build_book(args):
+    """Build the opening book consulted by Game.best_guess."""
+    start = time.time()
+    book = engine.build_opening_book(args.plies)
+
+    temp_file = engine.OPENING_BOOK_FILE + ".tmp"
+    with open(temp_file, "w", encoding="utf-8") as f:
+        json.dump(book, f, separators=(",", ":"))
+    os.replace(temp_file, engine.OPENING_BOOK_FILE)
+
+    print(
+        f"{Fore.GREEN}Saved {len(book['positions'])} positions to '{engine.OPENING_BOOK_FILE}' in {time.time() - start:.1f}s{Style.RESET_ALL}"
+    )
+
+
+def build_tree(args):
+    """Build the solution tree used by tree mode, reporting the exact WSE over its targets."""
+    engine.load_word_data()
+    targets = engine.possible_guesses if args.targets == "guesses" else engine.answers
+
+    start = time.time()
+    tree = engine.build_solution_tree(targets)
+
+    temp_file = engine.SOLUTION_TREE_FILE + ".tmp"
+    with open(temp_file, "w", encoding="utf-8") as f:
+        json.dump(tree, f, separators=(",", ":"))
+    os.replace(temp_file, engine.SOLUTION_TREE_FILE)
+
+    print(
+        f"{Fore.GREEN}Saved the solution tree for {tree['solved']}/{tree['targets']} targets to '{engine.SOLUTION_TREE_FILE}' in {time.time() - start:.1f}s{Style.RESET_ALL}"
+    )
+    print(f"{Fore.GREEN}Exact WSE: {tree['wse']}{Style.RESET_ALL}")
+    if tree["solved"] < tree["targets"]:
+        print(
+            f"{Fore.RED}Failed to solve {tree['targets'] - tree['solved']} targets, counted as {engine.FAILED_GUESSES} guesses{Style.RESET_ALL}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Build the precomputed files used by the engine."
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    matrix = commands.add_parser(
+        "matrix", help="build the guess x answer pattern matrix"
+    )
+    matrix.add_argument(
+        "--rebuild", action="store_true", help="rebuild even if it is up to date"
+    )
+    matrix.set_defaults(func=build_matrix)
+
+    bundle = commands.add_parser("bundle", help="compile the word data bundle")
+    bundle.add_argument(
+        "--rebuild", action="store_true", help="rebuild even if it is up to date"
+    )
+    bundle.set_defaults(func=build_bundle)
+
+    book = commands.add_parser("book", help="build the opening book")
+    book.add_argument(
+        "--plies", type=int, default=2, help="number of guesses to cover (default 2)"
+    )
+    book.set_defaults(func=build_book)
+
+    tree = commands.add_parser("tree", help="build the full solution tree")
+    tree.add_argument(
+        "--targets",
+        choices=["answers", "guesses"],
+        default="answers",
+        help="targets whose positions the tree covers (default answers)",
+    )
+    tree.set_defaults(func=build_tree)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,27 +4,226 @@ import csv
 import re
 import traceback
 import concurrent.futures
+import multiprocessing
+import os
+import random
+import json
+import hashlib
+import mmap
+import struct
+import time
+import heapq
+from collections import Counter, OrderedDict
+
+try:
+    import numpy as np
+except ImportError:  # The pattern matrix is optional, get_answer is used without it
+    np = None
+
+# Data files live next to this module, so the engine works from any working directory
+DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+FREQUENCIES_FILE = os.path.join(DATA_DIR, "word_frequencies.csv")
+GUESSES_FILE = os.path.join(DATA_DIR, "guesses.txt")
+ANSWERS_FILE = os.path.join(DATA_DIR, "answers.txt")
+
+# Compiled form of the three files above, rebuilt whenever they change
+WORD_BUNDLE_FILE = os.path.join(DATA_DIR, "words.bundle")
+WORD_BUNDLE_MAGIC = b"WRDB"
+WORD_BUNDLE_VERSION = 1
+WORD_BUNDLE_HEADER = struct.Struct("<4sI32sIII")
+
+# Word data loaded by load_word_data(), see __getattr__ for access from outside the module
+WORD_DATA_NAMES = ("freqs", "possible_guesses", "answers", "word_ids")
+
+PATTERN_MATRIX_FILE = os.path.join(DATA_DIR, "patterns.npy")
+PATTERN_COUNT = 243  # 3 ** 5 possible feedback patterns
+PATTERN_DIGITS = {"-": 0, "y": 1, "g": 2}
+WIN_CODE = PATTERN_COUNT - 1  # ggggg
+
+# The spread of a guess's information over the answers (the standard deviation of -log2 of the share of
+# answers giving each one's pattern), in bits, as measured for the top guesses at turns 2-4
+SAMPLE_DEVIATION = 3.0
+
+# Ways to rank guesses: expected information, or the pattern buckets a guess leaves (the largest one, the
+# sum of their squared sizes or the expected number of candidates left)
+SCORING_MODES = ("entropy", "minimax", "squares", "expected")
+
+# Guesses counted in the WSE for a target the engine failed to solve, or solved after the six guesses
+# Wordle allows
+FAILED_GUESSES = 7
+
+# A guess as the engine plays it, case folded: the letters index the per-letter bitmasks
+GUESS_PATTERN = re.compile(r"[a-z]{5}")
+
+# The yellow bit of letter a at every position, shifted by a letter index to get that letter's bits
+YELLOW_POSITIONS = sum(1 << (26 * i) for i in range(5))
+
+# Second guesses tried by the lookahead besides the answers left, taken from the top of the ranking
+LOOKAHEAD_PROBES = 100
+
+# Rows of Game.analyze stored for each opening book position, the most analyze answers from the book
+ANALYSIS_ROWS = 10
+
+OPENING_BOOK_FILE = os.path.join(DATA_DIR, "openings.json")
+SOLUTION_TREE_FILE = os.path.join(DATA_DIR, "tree.json")
+
+_word_data_hash = None
+_pattern_matrix = None
+_word_arrays = None
+_answer_word_ids = None
+_opening_book = None
+_opening_analysis = None
+_solution_tree = None
+_ranking_pool = None
+_worker_game = None
+_position_bits = None
+_letter_bits = None
+
+
+def __getattr__(name: str):
+    # Loads the word data the first time it is used from outside the module
+    if name in WORD_DATA_NAMES:
+        load_word_data()
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def load_word_data():
+    """
+    Loads the word lists and frequencies into the module globals, once per process.
+
+    The compiled bundle is used when it matches the source files, otherwise the sources are parsed and
+    the bundle is rebuilt for the next process.
+    """
+    global freqs, possible_guesses, answers, word_ids, _word_data_hash
+
+    if _word_data_hash is not None:
+        return
+
+    source_hash = hashlib.sha256()
+    for path in (FREQUENCIES_FILE, GUESSES_FILE, ANSWERS_FILE):
+        with open(path, "rb") as f:
+            source_hash.update(f.read())
+    source_hash = source_hash.digest()
+
+    data = load_word_bundle(source_hash)
+    if data is None:
+        data = parse_word_files()
+        try:
+            save_word_bundle(source_hash, *data)
+        except OSError:
+            pass  # The bundle is only a cache, parsing again next time is fine
+
+    freqs, possible_guesses, answers = data
+    word_ids = {word: i for i, word in enumerate(possible_guesses)}
+    _word_data_hash = source_hash.hex()
+
+
+def parse_word_files() -> tuple[dict[str, float], list[str], list[str]]:
+    """
+    Parses the frequency list, the guess list and the answer list from their text files.
+    """
+    freqs = {}
+
+    # Define a regex pattern to match keys that are exactly 5 letters long and contain only alphabetic characters
+    pattern = re.compile(r"^[a-zA-Z]{5}$")
+
+    # Open and read the CSV file
+    with open(FREQUENCIES_FILE, mode="r", newline="", encoding="utf-8") as file:
+        reader = csv.reader(file)
+
+        for row in reader:
+            # Ensure the row has at least two columns
+            if len(row) >= 2:
+                key, value = row[0], row[1]
+
+                # Apply the filter: only include keys that match the pattern (and skip the header)
+                if pattern.match(key):
+                    try:
+                        freqs[key] = float(value)
+                    except ValueError:
+                        continue
+
+    with open(GUESSES_FILE, "r") as f:
+        possible_guesses = [line.strip() for line in f if line.strip()]
+
+    with open(ANSWERS_FILE, "r") as f:
+        answers = [line.strip() for line in f if line.strip()]
+
+    return freqs, possible_guesses, answers
+
+
+def save_word_bundle(
+    source_hash: bytes,
+    freqs: dict[str, float],
+    possible_guesses: list[str],
+    answers: list[str],
+):
+    """
+    Writes the word lists and frequencies as a binary bundle of fixed-size records.
+
+    Every word takes 6 bytes (the word and a newline) so loading is a single decode and split.
+    """
+    header = WORD_BUNDLE_HEADER.pack(
+        WORD_BUNDLE_MAGIC,
+        WORD_BUNDLE_VERSION,
+        source_hash,
+        len(possible_guesses),
+        len(answers),
+        len(freqs),
+    )
+    words = [*possible_guesses, *answers, *freqs]
+    body = "".join(word + "\n" for word in words).encode("ascii")
+    padding = b"\0" * (-(len(header) + len(body)) % 8)
+    values = struct.pack(f"<{len(freqs)}d", *freqs.values())
+
+    temp_file = WORD_BUNDLE_FILE + ".tmp"
+    with open(temp_file, "wb") as f:
+        f.write(header + body + padding + values)
+    os.replace(temp_file, WORD_BUNDLE_FILE)
+
+
+def load_word_bundle(
+    source_hash: bytes,
+) -> tuple[dict[str, float], list[str], list[str]] | None:
+    """
+    Memory-maps the word bundle, returning None if it is missing or was built from other source files.
+    """
+    if not os.path.exists(WORD_BUNDLE_FILE):
+        return None
+
+    with open(WORD_BUNDLE_FILE, "rb") as f:
+        try:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # Empty file
+            return None
 
-freqs = {}
-
-# Define a regex pattern to match keys that are exactly 5 letters long and contain only alphabetic characters
-pattern = re.compile(r"^[a-zA-Z]{5}$")
-
-# Open and read the CSV file
-with open("word_frequencies.csv", mode="r", newline="", encoding="utf-8") as file:
-    reader = csv.reader(file)
+    with data:
+        if len(data) < WORD_BUNDLE_HEADER.size:
+            return None
+        magic, version, bundle_hash, guess_count, answer_count, freq_count = (
+            WORD_BUNDLE_HEADER.unpack_from(data)
+        )
+        if (
+            magic != WORD_BUNDLE_MAGIC
+            or version != WORD_BUNDLE_VERSION
+            or bundle_hash != source_hash
+        ):
+            return None
 
-    for row in reader:
-        # Ensure the row has at least two columns
-        if len(row) >= 2:
-            key, value = row[0], row[1]
+        offset = WORD_BUNDLE_HEADER.size
+        word_count = guess_count + answer_count + freq_count
+        words = data[offset : offset + word_count * 6 - 1].decode("ascii")
+        words = words.split("\n") if word_count else []
 
-            # Apply the filter: only include keys that match the pattern
-            if pattern.match(key):
-                freqs[key] = value
+        offset += word_count * 6
+        offset += -offset % 8
+        values = struct.unpack_from(f"<{freq_count}d", data, offset)
 
-with open("guesses.txt", "r") as f:
-    possible_guesses = [line.strip() for line in f if line.strip()]
+    possible_guesses = words[:guess_count]
+    answers = words[guess_count : guess_count + answer_count]
+    freqs = dict(zip(words[guess_count + answer_count :], values))
+    return freqs, possible_guesses, answers
 
 
 def get_answer(guess: str, target: str) -> str:
@@ -46,32 +245,1493 @@ def get_answer(guess: str, target: str) -> str:
     return "".join(result)
 
 
+def encode_pattern(pattern: str) -> int:
+    """
+    Encodes a feedback pattern as a base-3 integer (0-242), the first letter being the most significant digit.
+    """
+    code = 0
+    for char in pattern:
+        code = code * 3 + PATTERN_DIGITS[char]
+    return code
+
+
+def decode_pattern(code: int) -> str:
+    """
+    Decodes a base-3 pattern code back into its feedback pattern string.
+    """
+    chars = []
+    for _ in range(5):
+        code, digit = divmod(code, 3)
+        chars.append("-yg"[digit])
+    return "".join(reversed(chars))
+
+
+def build_pattern_matrix(words: list[str]) -> "np.ndarray":
+    """
+    Builds the guess x answer feedback matrix for the given words.
+
+    Args:
+        words (list[str]): The words used as both the guesses (rows) and the answers (columns).
+
+    Returns:
+        np.ndarray: A uint8 matrix where cell [i, j] is the encoded pattern of get_answer(words[i], words[j]).
+    """
+    letters = np.array([[ord(char) for char in word] for word in words], dtype=np.uint8)
+    weights = np.array([81, 27, 9, 3, 1], dtype=np.uint8)
+    matrix = np.empty((len(words), len(words)), dtype=np.uint8)
+
+    for row, guess in enumerate(letters):
+        green = letters == guess
+        digits = green.astype(np.uint8) * 2
+
+        # Yellows are handed out left to right while the letter is still unused in the target
+        used = {}
+        for i, char in enumerate(guess):
+            unused = (letters == char) & ~green
+            available = unused.sum(axis=1) - used.get(char, 0)
+            yellow = ~green[:, i] & (available > 0)
+            digits[:, i] |= yellow
+            used[char] = used.get(char, 0) + yellow
+
+        matrix[row] = digits @ weights
+
+    return matrix
+
+
+def check_pattern_matrix(
+    matrix: "np.ndarray", words: list[str], samples: int | None = 1000
+) -> bool:
+    """
+    Checks the pattern matrix against get_answer, which stays the reference implementation.
+
+    Args:
+        matrix (np.ndarray): The pattern matrix to check.
+        words (list[str]): The words the matrix was built for.
+        samples (int | None): The number of random (seeded) pairs to check, or None to check every pair.
+
+    Returns:
+        bool: Whether every checked cell matches get_answer.
+    """
+    if matrix.shape != (len(words), len(words)):
+        return False
+
+    if samples is None:
+        pairs = ((i, j) for i in range(len(words)) for j in range(len(words)))
+    else:
+        rng = random.Random(0)
+        pairs = (
+            (rng.randrange(len(words)), rng.randrange(len(words)))
+            for _ in range(samples)
+        )
+
+    return all(
+        matrix[i, j] == encode_pattern(get_answer(words[i], words[j])) for i, j in pairs
+    )
+
+
+def get_pattern_matrix() -> "np.ndarray | None":
+    """
+    Returns the memory-mapped pattern matrix for possible_guesses, building and saving it on first use.
+
+    Returns:
+        np.ndarray | None: The pattern matrix, or None if NumPy is not available.
+    """
+    global _pattern_matrix
+
+    if _pattern_matrix is not None or np is None:
+        return _pattern_matrix
+
+    load_word_data()
+
+    if os.path.exists(PATTERN_MATRIX_FILE):
+        matrix = np.load(PATTERN_MATRIX_FILE, mmap_mode="r")
+        if check_pattern_matrix(matrix, possible_guesses):
+            _pattern_matrix = matrix
+            return _pattern_matrix
+        del matrix
+        print(
+            f"{Fore.YELLOW}Pattern matrix is out of date, rebuilding it.{Style.RESET_ALL}"
+        )
+    else:
+        print(
+            f"{Fore.YELLOW}Building pattern matrix (this only happens once)...{Style.RESET_ALL}"
+        )
+
+    matrix = build_pattern_matrix(possible_guesses)
+    temp_file = PATTERN_MATRIX_FILE + ".tmp"
+    with open(temp_file, "wb") as f:
+        np.save(f, matrix)
+    os.replace(temp_file, PATTERN_MATRIX_FILE)
+
+    _pattern_matrix = np.load(PATTERN_MATRIX_FILE, mmap_mode="r")
+    return _pattern_matrix
+
+
+def get_word_arrays() -> tuple["np.ndarray", "np.ndarray", "np.ndarray"]:
+    """
+    Returns per-word arrays over possible_guesses used for vectorized scoring.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray, np.ndarray]: The frequency of each word (0.075 if unknown),
+        whether the word is in the frequency list, and a bitmask of the letters in the word.
+    """
+    global _word_arrays
+
+    if _word_arrays is None:
+        load_word_data()
+        frequencies = np.array(
+            [float(freqs.get(word, 0.075)) for word in possible_guesses]
+        )
+        in_freqs = np.array([word in freqs for word in possible_guesses])
+        letter_masks = np.array(
+            [get_letter_mask(word) for word in possible_guesses], dtype=np.int64
+        )
+        _word_arrays = frequencies, in_freqs, letter_masks
+
+    return _word_arrays
+
+
+def get_answer_word_ids() -> "np.ndarray":
+    """
+    Returns the ids of the words of answers.txt in possible_guesses, so answers share the guess ids,
+    rows and columns of the pattern matrix instead of having their own.
+    """
+    global _answer_word_ids
+
+    if _answer_word_ids is None:
+        load_word_data()
+        _answer_word_ids = np.array(
+            [word_ids[word] for word in answers if word in word_ids], dtype=np.intp
+        )
+
+    return _answer_word_ids
+
+
+def get_word_data_hash() -> str:
+    """
+    Returns a hash of the word data files, used to tell whether precomputed files are still valid.
+    """
+    load_word_data()
+    return _word_data_hash
+
+
+def get_opening_book() -> dict[str, str]:
+    """
+    Returns the opening book (position PWN -> best guess) built by build.py, or an empty book if there is none.
+    """
+    global _opening_book, _opening_analysis
+
+    if _opening_book is None:
+        _opening_book = {}
+        _opening_analysis = {}
+        if os.path.exists(OPENING_BOOK_FILE):
+            with open(OPENING_BOOK_FILE, "r", encoding="utf-8") as f:
+                book = json.load(f)
+            if book.get("words") == get_word_data_hash():
+                _opening_book = book["positions"]
+                _opening_analysis = book.get("analysis", {})
+            else:
+                print(
+                    f"{Fore.YELLOW}Opening book is out of date, ignoring it. Rebuild it with 'python build.py book'.{Style.RESET_ALL}"
+                )
+
+    return _opening_book
+
+
+def get_opening_analysis() -> dict[str, list[dict]]:
+    """
+    Returns the top ANALYSIS_ROWS rows of Game.analyze for the blank position and every position of the
+    opening book, keyed by PWN, or an empty dict if the book has none.
+    """
+    get_opening_book()
+    return _opening_analysis
+
+
+def build_opening_book(plies: int = 2, targets: list[str] | None = None) -> dict:
+    """
+    Precomputes the best guess for every position reachable within the given number of plies, along with
+    the top rows of Game.analyze for those positions and the blank one.
+
+    Args:
+        plies (int): The number of guesses to cover, 2 covers the second guess for every first pattern.
+        targets (list[str] | None): The possible answers used to find reachable positions, defaulting to possible_guesses.
+
+    Returns:
+        dict: The opening book, ready to be saved as JSON.
+    """
+    positions = {}
+    analysis = {}
+
+    def expand(game: Game, targets: list[str], ply: int):
+        guess = game.best_guess()
+        if guess is None:
+            return
+        pwn = game.encode_pwn(game.patterns, game.guesses)
+        if game.guesses:
+            positions[pwn] = guess
+        analysis[pwn] = game.analyze(ANALYSIS_ROWS)
+        if ply == plies:
+            return
+
+        groups = {}
+        for target in targets:
+            groups.setdefault(get_answer(guess, target), []).append(target)
+
+        for pattern, group in groups.items():
+            if pattern == "ggggg":
+                continue
+            child = game.fork()
+            child.play(guess, pattern)
+            expand(child, group, ply + 1)
+
+    game = Game()
+    game.debug = False
+    game.use_opening_book = False
+    expand(game, targets or possible_guesses, 1)
+
+    return {
+        "starting_word": game.starting_word,
+        "plies": plies,
+        "words": get_word_data_hash(),
+        "positions": positions,
+        "analysis": analysis,
+    }
+
+
+def get_solution_tree() -> list | None:
+    """
+    Returns the root node of the solution tree built by build.py, or None if there is none.
+
+    Each node is [guess, {pattern: child node}], the root holding the starting word.
+    """
+    global _solution_tree
+
+    if _solution_tree is None:
+        _solution_tree = []
+        if os.path.exists(SOLUTION_TREE_FILE):
+            with open(SOLUTION_TREE_FILE, "r", encoding="utf-8") as f:
+                tree = json.load(f)
+            if tree.get("words") == get_word_data_hash():
+                _solution_tree = tree["tree"]
+            else:
+                print(
+                    f"{Fore.YELLOW}Solution tree is out of date, ignoring it. Rebuild it with 'python build.py tree'.{Style.RESET_ALL}"
+                )
+
+    return _solution_tree or None
+
+
+def build_solution_tree(targets: list[str] | None = None) -> dict:
+    """
+    Solves every target and records the engine's guess at every position reached on the way.
+
+    Args:
+        targets (list[str] | None): The targets whose positions the tree covers, defaulting to answers.
+
+    Returns:
+        dict: The solution tree with the exact WSE (as get_wse counts it) and guess count histogram
+            over the targets, ready to be saved as JSON.
+    """
+    load_word_data()
+    targets = targets or answers
+    results = solve_many(targets, settings={"use_solution_tree": False})
+
+    root = None
+    histogram = {}
+    for target, guesses in results.items():
+        if guesses is None:
+            continue
+        histogram[len(guesses)] = histogram.get(len(guesses), 0) + 1
+
+        if root is None:
+            root = [guesses[0], {}]
+        node = root
+        for i, guess in enumerate(guesses[:-1]):
+            node = node[1].setdefault(get_answer(guess, target), [guesses[i + 1], {}])
+
+    solved = sum(histogram.values())
+    return {
+        "words": get_word_data_hash(),
+        "targets": len(targets),
+        "solved": solved,
+        "wse": get_wse(results),
+        "histogram": dict(sorted(histogram.items())),
+        "tree": root or [],
+    }
+
+
+def solve_many(
+    targets: list[str],
+    max_guesses: int | None = None,
+    settings: dict | None = None,
+) -> dict[str, list[str] | None]:
+    """
+    Plays complete games for many targets in lockstep, computing the best guess of each distinct position once.
+
+    Targets that received the same feedback so far are at the same position, so they share one game
+    until their feedback differs.
+
+    Args:
+        targets (list[str]): The target words to solve.
+        max_guesses (int | None): The number of guesses after which a game counts as failed, or None for no limit.
+        settings (dict | None): Game attributes to set on every game, for example {"use_opening_book": False}.
+
+    Returns:
+        dict[str, list[str] | None]: The guesses played for each target (the last one solving it), or None if
+        the engine failed to solve it.
+    """
+
+    def new_game() -> Game:
+        game = Game()
+        game.debug = False
+        for name, value in (settings or {}).items():
+            setattr(game, name, value)
+        return game
+
+    results = {}
+    positions = [(new_game(), list(dict.fromkeys(targets)))]
+
+    while positions:
+        next_positions = []
+
+        for game, group in positions:
+            guess = game.best_guess()
+            if guess is None:
+                results.update((target, None) for target in group)
+                continue
+
+            guesses = game.guesses + [guess]
+            groups = {}
+            for target in group:
+                groups.setdefault(get_answer(guess, target), []).append(target)
+
+            children = []
+            for pattern, subgroup in groups.items():
+                if pattern == "ggggg":
+                    results.update((target, guesses) for target in subgroup)
+                elif max_guesses is not None and len(guesses) >= max_guesses:
+                    results.update((target, None) for target in subgroup)
+                else:
+                    children.append((pattern, subgroup))
+
+            # The last child continues in this game, the others continue in a fork of it
+            for i, (pattern, subgroup) in enumerate(children):
+                child = game if i == len(children) - 1 else game.fork()
+                child.play(guess, pattern)
+                next_positions.append((child, subgroup))
+
+        positions = next_positions
+
+    return {target: results[target] for target in targets}
+
+
+def get_wse(results: dict) -> float | None:
+    """
+    Returns the average number of guesses over every target, counting the ones failed or solved after
+    six guesses as FAILED_GUESSES.
+
+    Args:
+        results (dict): The guesses played for each target, or None if it failed, as returned by solve_many.
+
+    Returns:
+        float | None: The WSE, or None without targets.
+    """
+    if not results:
+        return None
+    return sum(
+        min(len(guesses), FAILED_GUESSES) if guesses else FAILED_GUESSES
+        for guesses in results.values()
+    ) / len(results)
+
+
+def get_mp_context():
+    """
+    Returns the multiprocessing context for worker pools, preferring fork so workers inherit loaded tables.
+    """
+    if "fork" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("fork")
+    return multiprocessing.get_context()
+
+
+def preload_tables():
+    """
+    Loads every table the engine builds lazily, so worker processes forked afterwards inherit them instead
+    of building their own.
+    """
+    load_word_data()
+    get_position_bits()
+    get_letter_bits()
+    if get_pattern_matrix() is not None:
+        get_word_arrays()
+        get_answer_word_ids()
+
+
+def get_ranking_pool(workers: int) -> concurrent.futures.ProcessPoolExecutor:
+    """
+    Returns the process pool used to rank guesses in parallel, creating it on first use.
+    """
+    global _ranking_pool
+
+    if _ranking_pool is None or _ranking_pool[0] != workers:
+        if _ranking_pool is not None:
+            _ranking_pool[1].shutdown()
+        pool = concurrent.futures.ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=get_mp_context(),
+            initializer=get_pattern_matrix,
+        )
+        _ranking_pool = workers, pool
+
+    return _ranking_pool[1]
+
+
+def get_worker_game(options: dict) -> "Game":
+    """
+    Returns the game a worker process answers positions with, created on first use.
+
+    Args:
+        options (dict): Game attributes to set, as returned by Game.get_options. Derived state is cleared
+            when they differ from the previous task's.
+    """
+    global _worker_game
+
+    if _worker_game is None:
+        _worker_game = Game()
+        _worker_game.debug = False
+
+    _worker_game.apply_options(options)
+    return _worker_game
+
+
+def get_entropies_chunk(
+    guess_ids: "np.ndarray", answer_ids: "np.ndarray", population: int | None = None
+) -> "np.ndarray":
+    """
+    Calculates the entropies of a chunk of guesses in a worker process.
+    """
+    return get_entropies(
+        get_pattern_matrix(), guess_ids, answer_ids, population=population
+    )
+
+
+def rank_guesses_chunk(
+    game: "Game",
+    guesses: list[str],
+    frequency_multiplier: float,
+    discard_guesses_not_in_freqs: bool,
+) -> list[float]:
+    """
+    Scores a chunk of guesses with rank_guess in a worker process.
+    """
+    load_word_data()  # The game was unpickled, so its constructor did not load anything
+    return [
+        game.rank_guess(guess, frequency_multiplier, discard_guesses_not_in_freqs)
+        for guess in guesses
+    ]
+
+
+def get_position_bits() -> list[dict[str, int]]:
+    """
+    Returns, for each letter position, a bitset over possible_guesses of the words having each letter there.
+
+    Bit i of a bitset stands for possible_guesses[i], so filters become a few big-int ANDs.
+    """
+    global _position_bits
+
+    if _position_bits is None:
+        load_word_data()
+        _position_bits = []
+        for j in range(5):
+            flags = {}
+            for i, word in enumerate(possible_guesses):
+                if char_flags := flags.get(word[j]):
+                    char_flags[i] = 49  # "1"
+                else:
+                    flags[word[j]] = bytearray(b"0" * len(possible_guesses))
+                    flags[word[j]][i] = 49
+            _position_bits.append(
+                {char: int(char_flags[::-1], 2) for char, char_flags in flags.items()}
+            )
+
+    return _position_bits
+
+
+def get_letter_bits() -> dict[str, list[int]]:
+    """
+    Returns, for each letter, the bitsets over possible_guesses of the words using it at least 1 to 5 times.
+    """
+    global _letter_bits
+
+    if _letter_bits is None:
+        load_word_data()
+        flags = {}
+        for i, word in enumerate(possible_guesses):
+            for char, count in Counter(word).items():
+                char_flags = flags.get(char)
+                if char_flags is None:
+                    char_flags = flags[char] = [
+                        bytearray(b"0" * len(possible_guesses)) for _ in range(5)
+                    ]
+                for k in range(count):
+                    char_flags[k][i] = 49  # "1"
+        _letter_bits = {
+            char: [int(count_flags[::-1], 2) for count_flags in char_flags]
+            for char, char_flags in flags.items()
+        }
+
+    return _letter_bits
+
+
+def get_all_bits() -> int:
+    """
+    Returns the bitset containing every word in possible_guesses.
+    """
+    load_word_data()
+    return (1 << len(possible_guesses)) - 1
+
+
+def get_pattern_bits(guess: str, pattern: str, index: int) -> int:
+    """
+    Returns the bitset of words matching a single played guess under the rules of get_words_from_pattern.
+
+    Args:
+        guess (str): The played guess.
+        pattern (str): The pattern received for the guess.
+        index (int): The turn index of the guess within the game.
+
+    Returns:
+        int: The bitset of matching words (the guess itself is not removed).
+    """
+    position_bits = get_position_bits()
+    letters = set(guess)
+    bits = get_all_bits()
+
+    for j, state in enumerate(pattern):
+        if state == "g":
+            bits &= position_bits[j].get(guess[j], 0)
+            continue
+
+        # Words whose letter at this position appears anywhere in the guess
+        in_guess = 0
+        for char in letters:
+            in_guess |= position_bits[j].get(char, 0)
+
+        if state == "-":
+            bits &= ~in_guess
+        elif state == "y":
+            bits &= in_guess
+            if index < 5:
+                bits &= ~position_bits[index].get(guess[j], 0)
+
+    return bits
+
+
+def get_hard_mode_bits(guess: str, pattern: str) -> int:
+    """
+    Returns the bitset of words allowed in hard mode after a guess: every green letter stays in place and
+    every revealed letter is used, as many times as the guess revealed it.
+
+    Args:
+        guess (str): The played guess.
+        pattern (str): The pattern received for the guess.
+
+    Returns:
+        int: The bitset of allowed words.
+    """
+    position_bits = get_position_bits()
+    letter_bits = get_letter_bits()
+    bits = get_all_bits()
+    revealed = Counter()
+
+    for j, (char, state) in enumerate(zip(guess, pattern)):
+        if state == "g":
+            bits &= position_bits[j].get(char, 0)
+        if state != "-":
+            revealed[char] += 1
+
+    for char, count in revealed.items():
+        bits &= letter_bits.get(char, [0] * 5)[count - 1]
+
+    return bits
+
+
+def get_bit_indices(bits: int) -> list[int]:
+    """
+    Returns the indices of the set bits, in increasing order.
+    """
+    flags = format(bits, "b")[::-1]
+    indices = []
+    index = flags.find("1")
+    while index != -1:
+        indices.append(index)
+        index = flags.find("1", index + 1)
+    return indices
+
+
+def get_letter_mask(chars) -> int:
+    """
+    Returns a bitmask with one bit set per distinct letter in the given characters.
+    """
+    mask = 0
+    for char in chars:
+        letter = ord(char) - 97
+        if not 0 <= letter < 26:
+            raise ValueError(f"not a lowercase letter: {char!r}")
+        mask |= 1 << letter
+    return mask
+
+
+def get_pattern_counts(
+    matrix: "np.ndarray",
+    guess_ids: "np.ndarray",
+    answer_ids: "np.ndarray",
+    chunk_size: int = 1 << 22,
+    boards: "np.ndarray | None" = None,
+):
+    """
+    Counts the answers giving each pattern for every guess, a chunk of guesses at a time.
+
+    Args:
+        matrix (np.ndarray): The pattern matrix.
+        guess_ids (np.ndarray): The row ids of the guesses to count.
+        answer_ids (np.ndarray): The column ids of the possible answers.
+        chunk_size (int): The maximum number of patterns looked up at once, to bound memory use.
+        boards (np.ndarray | None): The board index of each answer, to count the patterns of several
+            boards separately in the same pass.
+
+    Yields:
+        tuple[int, np.ndarray]: The offset of the chunk in guess_ids and its counts, one row of
+        PATTERN_COUNT counts per board for each guess.
+    """
+    rows_per_chunk = max(1, chunk_size // max(1, len(answer_ids)))
+    bins = PATTERN_COUNT
+    if boards is not None:
+        bins *= int(boards.max()) + 1 if len(boards) else 1
+
+    for start in range(0, len(guess_ids), rows_per_chunk):
+        rows = guess_ids[start : start + rows_per_chunk]
+
+        # Offset each row's codes into its own block of bins so one bincount covers all rows
+        if len(answer_ids) == matrix.shape[1] and boards is None:
+            codes = matrix[rows]
+        elif len(answer_ids) < matrix.shape[1] // 16:
+            # Gathering only the needed cells beats copying whole rows when few answers are left
+            codes = matrix[np.ix_(rows, answer_ids)]
+        else:
+            codes = np.take(matrix[rows], answer_ids, axis=1)
+        codes = codes.astype(np.intp)
+        if boards is not None:
+            codes += boards * PATTERN_COUNT
+        codes += np.arange(len(rows))[:, None] * bins
+        counts = np.bincount(codes.ravel(), minlength=len(rows) * bins)
+
+        yield start, counts.reshape(len(rows), bins)
+
+
+def get_counts_entropy(counts: "np.ndarray", totals) -> "np.ndarray":
+    """
+    Returns the entropy of pattern histograms over their last axis, in bits.
+
+    Args:
+        counts (np.ndarray): The number of answers giving each pattern, as yielded by get_pattern_counts.
+        totals: The number of answers of each histogram, a number or an array broadcast against counts.
+    """
+    probabilities = counts / totals
+    logs = np.log2(
+        probabilities,
+        out=np.zeros_like(probabilities),
+        where=probabilities > 0,
+    )
+    return -(probabilities * logs).sum(axis=-1)
+
+
+def get_entropies(
+    matrix: "np.ndarray",
+    guess_ids: "np.ndarray",
+    answer_ids: "np.ndarray",
+    chunk_size: int = 1 << 22,
+    population: int | None = None,
+) -> "np.ndarray":
+    """
+    Calculates the entropy of every guess over the same answers in one pass.
+
+    Args:
+        matrix (np.ndarray): The pattern matrix.
+        guess_ids (np.ndarray): The row ids of the guesses to score.
+        answer_ids (np.ndarray): The column ids of the possible answers.
+        chunk_size (int): The maximum number of patterns looked up at once, to bound memory use.
+        population (int | None): The number of answers when answer_ids is a sample of them, to
+            correct the estimates for the sample's bias.
+
+    Returns:
+        np.ndarray: The entropy of each guess, in the order of guess_ids.
+    """
+    entropies = np.empty(len(guess_ids))
+
+    for start, counts in get_pattern_counts(matrix, guess_ids, answer_ids, chunk_size):
+        entropies[start : start + len(counts)] = get_counts_entropy(
+            counts, len(answer_ids)
+        )
+        if population is not None:
+            entropies[start : start + len(counts)] += get_sample_bias(
+                (counts > 0).sum(axis=1), len(answer_ids), population
+            )
+
+    return entropies
+
+
+def get_joint_entropies(
+    matrix: "np.ndarray",
+    guess_ids: "np.ndarray",
+    board_answer_ids: list["np.ndarray"],
+    chunk_size: int = 1 << 22,
+    populations: list[int] | None = None,
+) -> "np.ndarray":
+    """
+    Calculates, for every guess, the sum of its entropies over the answers of several boards in one pass.
+
+    The boards are independent, so the sum is the entropy of the patterns of all boards together.
+
+    Args:
+        matrix (np.ndarray): The pattern matrix.
+        guess_ids (np.ndarray): The row ids of the guesses to score.
+        board_answer_ids (list[np.ndarray]): The column ids of the possible answers of each board.
+        chunk_size (int): The maximum number of patterns looked up at once, to bound memory use.
+        populations (list[int] | None): The number of answers of each board when its answer ids are
+            a sample of them, to correct the estimates for the samples' bias.
+
+    Returns:
+        np.ndarray: The joint entropy of each guess, in the order of guess_ids.
+    """
+    # A board without answers adds no entropy, and get_pattern_counts sizes its bins by the boards seen
+    kept = [i for i, ids in enumerate(board_answer_ids) if len(ids)]
+    if not kept:
+        return np.zeros(len(guess_ids))
+    board_answer_ids = [board_answer_ids[i] for i in kept]
+    if populations is not None:
+        populations = [populations[i] for i in kept]
+
+    sizes = np.array([len(ids) for ids in board_answer_ids])
+    answer_ids = np.concatenate(board_answer_ids)
+    boards = np.repeat(np.arange(len(board_answer_ids)), sizes)
+    entropies = np.empty(len(guess_ids))
+
+    for start, counts in get_pattern_counts(
+        matrix, guess_ids, answer_ids, chunk_size, boards
+    ):
+        counts = counts.reshape(len(counts), len(board_answer_ids), PATTERN_COUNT)
+        entropies[start : start + len(counts)] = get_counts_entropy(
+            counts, sizes[None, :, None]
+        ).sum(axis=1)
+        if populations is not None:
+            entropies[start : start + len(counts)] += get_sample_bias(
+                (counts > 0).sum(axis=2), sizes, np.array(populations)
+            ).sum(axis=1)
+
+    return entropies
+
+
+def get_sample_size(answers_count: int, error: float) -> int:
+    """
+    Returns the number of answers to sample so entropy estimates have a standard error of error bits.
+
+    A bias corrected estimate from m of n answers drawn without replacement has a standard error of
+    about SAMPLE_DEVIATION * sqrt(1 / m - 1 / n), which is solved for m.
+    """
+    size = (SAMPLE_DEVIATION / error) ** 2
+    return max(1, math.ceil(size / (1 + size / answers_count)))
+
+
+def get_sample_bias(patterns, sample_size, population):
+    """
+    Returns how much the plug-in entropy of a sample underestimates the entropy (Miller-Madow), in bits.
+
+    Works on arrays or single values.
+
+    Args:
+        patterns: The number of patterns seen in the sample.
+        sample_size: The number of answers in the sample.
+        population: The number of answers sampled from. The bias vanishes as the sample covers them.
+    """
+    return (
+        (patterns - 1)
+        / (2 * sample_size * math.log(2))
+        * (1 - sample_size / population)
+    )
+
+
+def sample_answer_ids(answer_ids: "np.ndarray", size: int, seed: int) -> "np.ndarray":
+    """
+    Draws a stratified sample of the answers: they are split into size runs of consecutive ids, so of
+    neighboring words, and one answer is drawn from each run.
+    """
+    rng = np.random.default_rng(seed)
+    edges = np.linspace(0, len(answer_ids), size + 1)
+    picks = (edges[:-1] + rng.random(size) * np.diff(edges)).astype(np.intp)
+    return answer_ids[picks]
+
+
+def estimate_remaining_guesses(sizes: "np.ndarray") -> "np.ndarray":
+    """
+    Estimates the expected number of guesses needed to solve sets of the given numbers of candidates.
+
+    One candidate takes one guess and two take 1.5, larger sets are estimated from their entropy.
+    """
+    sizes = np.maximum(sizes, 1)
+    return 1 + 0.5 * np.log2(sizes)
+
+
+def get_expected_guesses(
+    matrix: "np.ndarray",
+    guess_ids: "np.ndarray",
+    answer_ids: "np.ndarray",
+    chunk_size: int = 1 << 22,
+) -> "np.ndarray":
+    """
+    Calculates, for every guess, the expected number of guesses to solve the answers when playing it next.
+
+    The guess counts once, and every pattern other than a win adds the estimated guesses for its answers.
+
+    Args:
+        matrix (np.ndarray): The pattern matrix.
+        guess_ids (np.ndarray): The row ids of the guesses to score.
+        answer_ids (np.ndarray): The column ids of the possible answers.
+        chunk_size (int): The maximum number of patterns looked up at once, to bound memory use.
+
+    Returns:
+        np.ndarray: The expected number of guesses for each guess, in the order of guess_ids.
+    """
+    expected = np.empty(len(guess_ids))
+
+    for start, counts in get_pattern_counts(matrix, guess_ids, answer_ids, chunk_size):
+        counts[:, WIN_CODE] = 0
+        remaining = (counts * estimate_remaining_guesses(counts)).sum(axis=1)
+        expected[start : start + len(counts)] = 1 + remaining / len(answer_ids)
+
+    return expected
+
+
+def get_bucket_stats(
+    matrix: "np.ndarray",
+    guess_ids: "np.ndarray",
+    answer_ids: "np.ndarray",
+    chunk_size: int = 1 << 22,
+) -> tuple["np.ndarray", "np.ndarray", "np.ndarray"]:
+    """
+    Summarizes the pattern histogram of every guess in one pass.
+
+    The winning pattern's answer is solved, so its bucket is left out of the largest bucket and the
+    squared sizes.
+
+    Args:
+        matrix (np.ndarray): The pattern matrix.
+        guess_ids (np.ndarray): The row ids of the guesses to score.
+        answer_ids (np.ndarray): The column ids of the possible answers.
+        chunk_size (int): The maximum number of patterns looked up at once, to bound memory use.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray, np.ndarray]: The entropy, largest bucket and sum of squared bucket
+        sizes of each guess, in the order of guess_ids.
+    """
+    entropies = np.empty(len(guess_ids))
+    largest = np.empty(len(guess_ids), dtype=np.int64)
+    squares = np.empty(len(guess_ids), dtype=np.int64)
+
+    for start, counts in get_pattern_counts(matrix, guess_ids, answer_ids, chunk_size):
+        end = start + len(counts)
+        entropies[start:end] = get_counts_entropy(counts, len(answer_ids))
+
+        counts[:, WIN_CODE] = 0
+        largest[start:end] = counts.max(axis=1)
+        squares[start:end] = (counts * counts).sum(axis=1)
+
+    return entropies, largest, squares
+
+
+def get_scoring_costs(largest, squares, answers_count: int, scoring: str):
+    """
+    Returns the cost of guesses under one of the bucket SCORING_MODES, lower being better.
+
+    Works on arrays or single values. Minimax settles ties on the largest bucket by the squared sizes,
+    which are below answers_count ** 2 + 1 so they never outweigh one word of the largest bucket.
+
+    Args:
+        largest: The largest bucket of each guess, as returned by get_bucket_stats.
+        squares: The sum of squared bucket sizes of each guess.
+        answers_count (int): The number of possible answers.
+        scoring (str): The scoring mode, other than "entropy".
+    """
+    if scoring == "minimax":
+        return largest + squares / (answers_count * answers_count + 1)
+    elif scoring == "squares":
+        return squares * 1.0
+    elif scoring == "expected":
+        return squares / answers_count
+
+    raise ValueError(f"unknown scoring mode: {scoring}")
+
+
+def positive_float(value: str) -> float:
+    """
+    Parses the UWI value of a setting that must be above 0.
+
+    Raises:
+        ValueError: If the value is not a number above 0.
+    """
+    parsed = float(value)
+    if not parsed > 0:
+        raise ValueError(f"not above 0: {value}")
+    return parsed
+
+
+def positive_int(value: str) -> int:
+    """
+    Parses the UWI value of a setting that must be at least 1.
+
+    Raises:
+        ValueError: If the value is not an integer of at least 1.
+    """
+    parsed = int(value)
+    if parsed < 1:
+        raise ValueError(f"not at least 1: {value}")
+    return parsed
+
+
+def scoring_mode(value: str) -> str:
+    """
+    Parses the UWI value of the scoring setting.
+
+    Raises:
+        ValueError: If the value is not one of SCORING_MODES.
+    """
+    if value not in SCORING_MODES:
+        raise ValueError(f"unknown scoring mode: {value}")
+    return value
+
+
+def get_solvable_size(guesses_left: int) -> int:
+    """
+    Returns the most answers that can be told apart and solved within guesses_left guesses.
+
+    A guess solves at most one answer and splits the others into PATTERN_COUNT - 1 buckets.
+    """
+    if guesses_left <= 0:
+        return 0
+    return 1 + (PATTERN_COUNT - 1) * get_solvable_size(guesses_left - 1)
+
+
+def can_solve_within(
+    matrix: "np.ndarray",
+    answer_ids: "np.ndarray",
+    guesses_left: int,
+    guess_ids: "np.ndarray | None" = None,
+    width: int | None = None,
+    first_guess: int | None = None,
+    memo: dict | None = None,
+) -> bool:
+    """
+    Returns whether every answer can be solved within guesses_left guesses, each guess chosen from
+    guess_ids after seeing the patterns of the previous ones.
+
+    At each position guesses are tried from the smallest largest bucket, skipping the ones leaving a
+    bucket too large for the guesses left. With width set, only the width best of them are tried: True is
+    still a proof, but False only means no strategy was found among them. Results are memoized on the
+    candidate set, so positions reached by different guesses are checked once.
+
+    Args:
+        matrix (np.ndarray): The pattern matrix.
+        answer_ids (np.ndarray): The column ids of the possible answers.
+        guesses_left (int): The number of guesses allowed.
+        guess_ids (np.ndarray | None): The row ids of the allowed guesses, every guess if None.
+        width (int | None): The number of guesses tried at each position, all of them if None.
+        first_guess (int | None): The row id of a guess to play first, to check a starting word.
+        memo (dict | None): Results of earlier checks over the same guesses and width to reuse.
+
+    Returns:
+        bool: Whether a strategy solving every answer within guesses_left guesses was found.
+    """
+    if guess_ids is None:
+        guess_ids = np.arange(matrix.shape[0])
+    memo = {} if memo is None else memo
+
+    def split(guess_id: int, ids: "np.ndarray") -> list["np.ndarray"]:
+        # The answers giving each pattern other than a win, largest bucket first as it is the likeliest
+        # to fail. A stable sort keeps every bucket's ids sorted, so equal sets get equal keys
+        codes = matrix[guess_id][ids]
+        order = np.argsort(codes, kind="stable")
+        edges = np.flatnonzero(np.diff(codes[order])) + 1
+        buckets = [
+            ids[group]
+            for group in np.split(order, edges)
+            if codes[group[0]] != WIN_CODE
+        ]
+        return sorted(buckets, key=len, reverse=True)
+
+    def solves_all(guess_id: int, ids: "np.ndarray", left: int) -> bool:
+        return all(solvable(bucket, left - 1) for bucket in split(guess_id, ids))
+
+    def solvable(ids: "np.ndarray", left: int) -> bool:
+        if len(ids) <= 1:
+            return len(ids) == 0 or left >= 1
+        if len(ids) > get_solvable_size(left):
+            return False
+
+        key = ids.tobytes(), left
+        if key in memo:
+            return memo[key]
+
+        _, largest, squares = get_bucket_stats(matrix, guess_ids, ids)
+        order = np.lexsort((squares, largest))
+        order = order[
+            (largest[order] <= get_solvable_size(left - 1))
+            & (largest[order] < len(ids))
+        ]
+        if width is not None:
+            order = order[:width]
+
+        result = any(solves_all(guess_ids[index], ids, left) for index in order)
+        memo[key] = result
+        return result
+
+    answer_ids = np.sort(np.asarray(answer_ids, dtype=np.intp))
+    if first_guess is None:
+        return solvable(answer_ids, guesses_left)
+
+    if guesses_left <= 0:
+        return len(answer_ids) == 0
+    return solves_all(first_guess, answer_ids, guesses_left)
+
+
+def parse_option(value: str, option_type: type):
+    """
+    Parses the UWI text value of a setting, "1"/"0" (or "true"/"false", "on"/"off") for switches.
+
+    Raises:
+        ValueError: If the value is not valid for the type.
+    """
+    if option_type is bool:
+        if value.lower() not in ("1", "0", "true", "false", "on", "off"):
+            raise ValueError(f"invalid switch value: {value}")
+        return value.lower() in ("1", "true", "on")
+
+    return option_type(value)
+
+
+class RankingCache:
+    """
+    A bounded LRU cache of ranked positions that can be shared between games.
+
+    Positions are keyed by a fingerprint of their candidate set together with the rest of the
+    state that affects ranking, so the same position reached in another game is a hit.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.entries = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, key, ranking: tuple):
+        if key in self.entries:
+            self.size -= self.entries.pop(key)[1]
+
+        # Roughly a pointer per guess plus one float per score
+        size = 16 * len(ranking[0]) + 64
+        self.entries[key] = (ranking, size)
+        self.size += size
+
+        while self.size > self.max_bytes and len(self.entries) > 1:
+            _, (_, evicted_size) = self.entries.popitem(last=False)
+            self.size -= evicted_size
+            self.evictions += 1
+
+    def clear(self):
+        self.entries.clear()
+        self.size = 0
+
+    def get_stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "bytes": self.size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+# Shared by every game in the process unless a game is given its own cache
+ranking_cache = RankingCache()
+
+
+class GameStats:
+    """
+    Timings and call counts of the hot paths of the games it is attached to through Game.stats.
+
+    Games only record when a GameStats is attached, so the default of None costs one attribute check
+    per call. One instance can be attached to many games to aggregate a whole run.
+    """
+
+    COUNTERS = (
+        "get_words_from_pattern",
+        "calculate_entropy",
+        "get_answer",
+        "rank_guess",
+        "vectorized_entropies",
+        "pattern_lookups",
+        "entropy_cache_hits",
+        "ranking_cache_hits",
+        "ranking_cache_misses",
+        "lookahead_guesses",
+        "sampled_rankings",
+    )
+    TIMERS = (
+        "get_words_from_pattern",
+        "calculate_entropy",
+        "rank_guess",
+        "rank_guesses_vectorized",
+        "lookahead",
+    )
+
+    def __init__(self):
+        self.calls = dict.fromkeys(self.COUNTERS, 0)
+        self.times = dict.fromkeys(self.TIMERS, 0.0)
+        self.turns = []
+
+        # Where the guess of the current turn came from: start, tree, book, cache or search
+        self.source = None
+
+    def count(self, name: str, n: int = 1):
+        self.calls[name] += n
+
+    def add_time(self, name: str, seconds: float):
+        self.times[name] += seconds
+
+    def record_turn(
+        self,
+        ply: int,
+        candidates: int,
+        seconds: float,
+        guess: str | None,
+        calls_before: dict,
+    ):
+        """
+        Records one best_guess call with the calls it made.
+
+        Args:
+            ply (int): The number of guesses played before this one.
+            candidates (int): The number of words still matching the position.
+            seconds (float): The wall time of the turn.
+            guess (str | None): The guess returned.
+            calls_before (dict): A copy of self.calls taken when the turn started.
+        """
+        self.turns.append(
+            {
+                "ply": ply,
+                "candidates": candidates,
+                "time": seconds,
+                "guess": guess,
+                "source": self.source,
+                "calls": {
+                    name: count - calls_before[name]
+                    for name, count in self.calls.items()
+                    if count != calls_before[name]
+                },
+            }
+        )
+        self.source = None
+
+    def merge(self, other: "GameStats"):
+        """
+        Adds the calls, times and turns of another instance, for example one returned by a worker process.
+        """
+        for name, count in other.calls.items():
+            self.calls[name] += count
+        for name, seconds in other.times.items():
+            self.times[name] += seconds
+        self.turns.extend(other.turns)
+
+    def get_summary(self) -> dict:
+        """
+        Aggregates the turns by ply.
+
+        Returns:
+            dict: For each ply, the number of turns, their total, mean and maximum time, the mean
+            number of candidates and where the guesses came from.
+        """
+        plies = {}
+        for turn in self.turns:
+            ply = plies.setdefault(
+                turn["ply"],
+                {
+                    "turns": 0,
+                    "time": 0.0,
+                    "max_time": 0.0,
+                    "candidates": 0,
+                    "sources": Counter(),
+                },
+            )
+            ply["turns"] += 1
+            ply["time"] += turn["time"]
+            ply["max_time"] = max(ply["max_time"], turn["time"])
+            ply["candidates"] += turn["candidates"]
+            ply["sources"][turn["source"]] += 1
+
+        return {
+            ply: {
+                "turns": entry["turns"],
+                "time": entry["time"],
+                "mean_time": entry["time"] / entry["turns"],
+                "max_time": entry["max_time"],
+                "mean_candidates": entry["candidates"] / entry["turns"],
+                "sources": dict(entry["sources"]),
+            }
+            for ply, entry in sorted(plies.items())
+        }
+
+    def to_dict(self, turns: bool = True) -> dict:
+        """
+        Returns the statistics as a JSON-serializable dict.
+
+        Args:
+            turns (bool): Whether to include every turn, or only the per-ply summary.
+        """
+        calls = self.calls
+        ranking_lookups = calls["ranking_cache_hits"] + calls["ranking_cache_misses"]
+        stats = {
+            "calls": dict(calls),
+            "times": dict(self.times),
+            "entropy_cache_hit_rate": (
+                calls["entropy_cache_hits"] / calls["calculate_entropy"]
+                if calls["calculate_entropy"]
+                else 0.0
+            ),
+            "ranking_cache_hit_rate": (
+                calls["ranking_cache_hits"] / ranking_lookups
+                if ranking_lookups
+                else 0.0
+            ),
+            "plies": self.get_summary(),
+        }
+        if turns:
+            stats["turns"] = self.turns
+        return stats
+
+
 class Game:
+    # Games are created for every session and search branch, so they keep no per-instance __dict__
+    __slots__ = (
+        "starting_word",
+        "_greys",
+        "_greens",
+        "_yellows",
+        "guesses",
+        "patterns",
+        "candidates",
+        "_candidate_bits",
+        "_candidate_ids",
+        "_candidate_fingerprint",
+        "_answer_pool",
+        "_answer_pool_ids",
+        "_answer_pool_set",
+        "_legal_bits",
+        "_hard_mode_guesses",
+        "entropy_cache",
+        "ranking_cache",
+        "use_info_gain",
+        "use_pattern_matrix",
+        "use_vectorized",
+        "use_opening_book",
+        "use_solution_tree",
+        "use_answer_pool",
+        "workers",
+        "use_lookahead",
+        "lookahead_top_k",
+        "lookahead_time",
+        "use_sampling",
+        "sample_error",
+        "sample_top_k",
+        "sample_seed",
+        "scoring",
+        "hard_mode",
+        "stats",
+        "debug",
+    )
+
+    # Settings changed with the UWI command "set NAME VALUE": option name -> (attribute, type)
+    OPTIONS = {
+        "lookahead": ("use_lookahead", bool),
+        "lookahead_k": ("lookahead_top_k", positive_int),
+        "lookahead_time": ("lookahead_time", float),
+        "answer_pool": ("use_answer_pool", bool),
+        "sampling": ("use_sampling", bool),
+        "sample_error": ("sample_error", positive_float),
+        "sample_k": ("sample_top_k", positive_int),
+        "sample_seed": ("sample_seed", int),
+        "scoring": ("scoring", scoring_mode),
+        "hard": ("hard_mode", bool),
+    }
+
     def __init__(self):
-        self.starting_word = "salet"
+        load_word_data()
 
-        self.not_possible_chars = set()
-        self.known_not_words = set()
+        self.starting_word = "salet"
 
-        self.known = ["*"] * 5
-        self.unknown = []
+        # Letters seen grey (bit per letter), greens (5 bits per position holding the letter + 1, 0 if
+        # unknown) and yellows (bit per position and letter, position * 26 + letter)
+        self._greys = 0
+        self._greens = 0
+        self._yellows = 0
 
         self.guesses = []
         self.patterns = []
 
+        # Words still matching every played guess, narrowed by play() one guess at a time
+        self.candidates = possible_guesses
+        self._candidate_bits = get_all_bits()
+        self._candidate_ids = None
+        self._candidate_fingerprint = None
+
+        # Words of answers.txt still matching every played guess exactly, computed when first needed
+        self._answer_pool = None
+        self._answer_pool_ids = None
+        self._answer_pool_set = None
+
+        # Words allowed by the hard mode rules, narrowed by play() whatever the mode so it can be switched
+        # on at any time, and the guess pool they leave, computed when first needed
+        self._legal_bits = get_all_bits()
+        self._hard_mode_guesses = None
+
         self.entropy_cache = {}
+        self.ranking_cache = ranking_cache
 
         self.use_info_gain = True
+        self.use_pattern_matrix = True
+        self.use_vectorized = True
+        self.use_opening_book = True
+        self.use_solution_tree = True
+
+        # Score entropy over the answers left instead of every word left, probing with any valid guess
+        self.use_answer_pool = False
+
+        # Number of processes used to rank guesses, 1 ranks them in this process
+        self.workers = 1
+
+        # Re-rank the top guesses by the expected number of guesses two plies ahead, within a time budget
+        self.use_lookahead = False
+        self.lookahead_top_k = 10
+        self.lookahead_time = 1.0
+
+        # Estimate entropies from a sample of the answers with a standard error of sample_error bits when
+        # that at least halves the answers, from (SAMPLE_DEVIATION / sample_error) ** 2 answers on (144 by
+        # default), scoring the sample_top_k best estimates exactly
+        self.use_sampling = False
+        self.sample_error = 0.25
+        self.sample_top_k = 50
+        self.sample_seed = 0
+
+        # One of SCORING_MODES. Modes other than entropy rank guesses by the pattern buckets they leave
+        # alone, for adversarial variants and worst-case play
+        self.scoring = "entropy"
+
+        # Only choose guesses that use every revealed hint, which also makes the guess pool smaller
+        self.hard_mode = False
+
+        # A GameStats to record timings and call counts into, None records nothing. Work done in
+        # ranking pool processes is not recorded
+        self.stats = None
+
+        self.debug = True
 
     def clean(self):
-        self.known = ["*"] * 5
-        self.unknown = []
+        self._greys = 0
+        self._greens = 0
+        self._yellows = 0
         self.guesses = []
         self.patterns = []
-        self.not_possible_chars = set()
-        self.known_not_words = set()
+        self.candidates = possible_guesses
+        self._candidate_bits = get_all_bits()
+        self._candidate_ids = None
+        self._candidate_fingerprint = None
+        self._answer_pool = None
+        self._answer_pool_ids = None
+        self._answer_pool_set = None
+        self._legal_bits = get_all_bits()
+        self._hard_mode_guesses = None
         self.entropy_cache = {}
 
+    @property
+    def not_possible_chars(self) -> set[str]:
+        """The letters that received a grey, as a read-only set."""
+        return {chr(97 + i) for i in range(26) if self._greys >> i & 1}
+
+    @property
+    def known(self) -> list[str]:
+        """The green letter of each position, or "*" if it is unknown, as a read-only list."""
+        return [
+            chr(96 + code) if (code := self._greens >> (5 * i) & 31) else "*"
+            for i in range(5)
+        ]
+
+    @property
+    def unknown(self) -> list[dict]:
+        """The yellow letters as {"char", "index"} dicts in position order, as a read-only list."""
+        return [
+            {"char": chr(97 + bit % 26), "index": bit // 26}
+            for bit in get_bit_indices(self._yellows)
+        ]
+
+    @property
+    def known_not_words(self) -> set[str]:
+        """The words already guessed, as a read-only set."""
+        return set(self.guesses)
+
+    def fork(self) -> "Game":
+        """
+        Returns a copy of the game that can be played independently, sharing everything play() replaces
+        instead of mutating (candidates, their bitset and ids, the answer pool) with this game.
+
+        Returns:
+            Game: The copy, with the same position and settings.
+        """
+        game = Game.__new__(Game)
+        for name in Game.__slots__:
+            setattr(game, name, getattr(self, name))
+
+        game.guesses = list(self.guesses)
+        game.patterns = list(self.patterns)
+        game.entropy_cache = dict(self.entropy_cache)
+        return game
+
+    def __copy__(self) -> "Game":
+        return self.fork()
+
+    def __getstate__(self) -> dict:
+        # Games are pickled to ranking pool processes, which need neither the shared ranking cache nor
+        # the stats, and the cache alone can be tens of megabytes
+        state = {name: getattr(self, name) for name in Game.__slots__}
+        state["ranking_cache"] = None
+        state["stats"] = None
+        return state
+
+    def __setstate__(self, state: dict):
+        for name, value in state.items():
+            setattr(self, name, value)
+
     def decode_pwn(self, pwn: str) -> tuple[list[str], list[str]]:
         """
         Decodes the given PWN (Portable Wordle Notation) string.
@@ -88,10 +1748,23 @@ class Game:
         for chunk in chunks:
             if chunk == "":
                 continue
-            guesses.append(chunk[:5])
+            guesses.append(chunk[:5].lower())
             patterns.append(chunk[5:])
         return patterns, guesses
 
+    def encode_pwn(self, patterns: list[str], guesses: list[str]) -> str:
+        """
+        Encodes the given patterns and guesses as a PWN (Portable Wordle Notation) string.
+
+        Args:
+            patterns (list[str]): The patterns received for the guesses.
+            guesses (list[str]): The guesses played.
+
+        Returns:
+            str: The PWN string, the inverse of decode_pwn.
+        """
+        return "/".join(guess + pattern for guess, pattern in zip(guesses, patterns))
+
     def uwi_cmd(self, cmd: str) -> str:
         """
         Executes the given UWI (Universal Wordle Interface) command.
@@ -102,7 +1775,8 @@ class Game:
         Returns:
             str: The output of the command.
         """
-        print(f"{Fore.CYAN}Received UWI command: {cmd}{Style.RESET_ALL}")  # For debug
+        if self.debug:
+            print(f"{Fore.CYAN}Received UWI command: {cmd}{Style.RESET_ALL}")
 
         if cmd == "uwi":
             return "uwi2ok"
@@ -110,10 +1784,11 @@ class Game:
             try:
                 position = cmd[4:]
                 if position == "blank":
+                    self.set_position([], [])
                     return "posok"
                 else:
                     position = self.decode_pwn(position)
-                    self.play_all(position[1], position[0])
+                    self.set_position(position[0], position[1])
                     return "posok"
             except Exception as e:
                 with open("error.log", "w") as f:
@@ -123,13 +1798,22 @@ class Game:
                 )
                 return "poserror"
         elif cmd == "guess":
-            return "guessok\n" + self.best_guess() or "guesserror"
+            guess = self.best_guess()
+            return "guessok\n" + guess if guess else "guesserror"
+        elif cmd.startswith("analyze "):
+            try:
+                count = int(cmd[8:])
+            except ValueError:
+                return "analyzeerror"
+            return "analyzeok" + "".join(
+                f"\n{row['guess']} {row['entropy']:.4f} {row['frequency']:.4f} {row['score']:.4f}"
+                for row in self.analyze(count)
+            )
         elif cmd.startswith("pwn "):
             try:
                 pwn = cmd[4:]
                 position = self.decode_pwn(pwn)
-                self.clean()
-                self.play_all(position[1], position[0])
+                self.set_position(position[0], position[1])
                 return "pwnok"
             except Exception as e:
                 with open("error.log", "w") as f:
@@ -138,58 +1822,182 @@ class Game:
                     f"{Fore.RED}Error while executing UWI command {cmd}. Check 'error.log' for details.{Style.RESET_ALL}"
                 )
                 return "pwnerror"
+        elif cmd.startswith("move "):
+            try:
+                move = cmd[5:]
+                if len(move) != 10:
+                    return "moveerror"
+                self.play(move[:5], move[5:])
+                return "moveok"
+            except Exception as e:
+                with open("error.log", "w") as f:
+                    f.write(traceback.format_exc())
+                print(
+                    f"{Fore.RED}Error while executing UWI command {cmd}. Check 'error.log' for details.{Style.RESET_ALL}"
+                )
+                return "moveerror"
+        elif cmd.startswith("solvable "):
+            args = cmd[9:].split(" ")
+            try:
+                guesses_left = int(args[0])
+            except ValueError:
+                return "solvableerror"
+            if len(args) > 2 or (len(args) == 2 and args[1] not in word_ids):
+                return "solvableerror"
+            try:
+                solvable = self.can_solve_within(
+                    guesses_left, args[1] if len(args) == 2 else None
+                )
+            except RuntimeError:
+                return "solvableerror"
+            return "solvableok\n" + ("1" if solvable else "0")
+        elif cmd.startswith("set "):
+            option = cmd[4:].split(" ")
+            if len(option) != 2 or not self.set_option(option[0], option[1]):
+                return "seterror"
+            return "setok"
+        elif cmd == "stats on":
+            if self.stats is None:
+                self.stats = GameStats()
+            return "statsok"
+        elif cmd == "stats off":
+            self.stats = None
+            return "statsok"
+        elif cmd == "stats":
+            if self.stats is None:
+                return "statserror"
+            stats = self.stats.to_dict()
+            if self.ranking_cache is not None:
+                stats["shared_ranking_cache"] = self.ranking_cache.get_stats()
+            return "statsok\n" + json.dumps(stats)
         elif cmd.startswith("win") or cmd.startswith("lose"):
             return cmd + "ok"
 
+    def set_option(self, name: str, value: str) -> bool:
+        """
+        Sets one of the OPTIONS from its UWI text value.
+
+        Args:
+            name (str): The option name.
+            value (str): The value, "1"/"0" (or "true"/"false", "on"/"off") for switches.
+
+        Returns:
+            bool: Whether the option exists and the value is valid.
+        """
+        if name not in self.OPTIONS:
+            return False
+
+        attribute, option_type = self.OPTIONS[name]
+        try:
+            parsed = parse_option(value, option_type)
+        except ValueError:
+            return False
+
+        self.apply_options({attribute: parsed})
+        return True
+
+    def apply_options(self, options: dict):
+        """
+        Sets settings by attribute, as returned by get_options, resetting what was derived from them.
+
+        Args:
+            options (dict): The attributes to set and their values.
+        """
+        changed = False
+        for attribute, value in options.items():
+            if getattr(self, attribute) != value:
+                setattr(self, attribute, value)
+                changed = True
+
+        if changed:
+            # Cached entropies and the hard mode guess pool may have been computed with other settings
+            self.entropy_cache = {}
+            self._hard_mode_guesses = None
+
+    def get_options(self) -> dict:
+        """
+        Returns the attributes behind OPTIONS and their values, to copy the settings to another game.
+        """
+        return {
+            attribute: getattr(self, attribute)
+            for attribute, _ in self.OPTIONS.values()
+        }
+
+    def uses_default_search(self, discard_guesses_not_in_freqs: bool = True) -> bool:
+        """
+        Returns whether guesses are searched with the default settings, the ones the solution tree and
+        opening book were built with.
+        """
+        return (
+            discard_guesses_not_in_freqs
+            and not self.use_lookahead
+            and not self.use_answer_pool
+            and not self.use_sampling
+            and self.scoring == "entropy"
+            and not self.hard_mode
+        )
+
     def get_words_from_pattern(
         self, patterns: list[str], guesses: list[str]
     ) -> list[str]:
         """
-        Quickly filter words based on patterns and guesses, minimizing unnecessary checks.
+        Quickly filter words based on patterns and guesses, each constraint being one bitset operation.
         """
-        new_words = []
+        stats = self.stats
+        if stats is not None:
+            stats.count("get_words_from_pattern")
+            start = time.perf_counter()
 
-        for word in possible_guesses:
-            if word in guesses:
-                continue
+        bits = get_all_bits()
+
+        for i, pattern in enumerate(patterns):
+            bits &= get_pattern_bits(guesses[i], pattern, i)
+
+        for guess in guesses:
+            if guess in word_ids:
+                bits &= ~(1 << word_ids[guess])
+
+        words = [possible_guesses[i] for i in get_bit_indices(bits)]
+
+        if stats is not None:
+            stats.add_time("get_words_from_pattern", time.perf_counter() - start)
+        return words
+
+    def get_answer_ids(self, words: list[str]) -> "np.ndarray":
+        """
+        Returns the pattern matrix column ids of the given words, reusing the ids of the current candidates.
+        """
+        if words is possible_guesses:
+            return np.arange(len(words))
+
+        if words is self.candidates and self._candidate_ids is not None:
+            return self._candidate_ids
 
-            match = True
-            for i, pattern in enumerate(patterns):
-                for j, char in enumerate(word):
-                    if pattern[j] == "-" and char in guesses[i]:
-                        match = False
-                        break
-                    elif pattern[j] == "y" and (
-                        char not in guesses[i] or word[i] == guesses[i][j]
-                    ):
-                        match = False
-                        break
-                    elif pattern[j] == "g" and word[j] != guesses[i][j]:
-                        match = False
-                        break
-
-                if not match:
-                    break
-
-            if match:
-                new_words.append(word)
-
-        return new_words
+        if words is self._answer_pool and self._answer_pool_ids is not None:
+            return self._answer_pool_ids
+
+        ids = np.fromiter(
+            (word_ids[word] for word in words), dtype=np.intp, count=len(words)
+        )
+        if words is self.candidates:
+            self._candidate_ids = ids
+        return ids
 
     def calculate_entropy(self, guess: str, possible_words: list[str]) -> float:
         """
         Calculate and cache the entropy for a given guess based on the possible words.
         """
+        stats = self.stats
+        if stats is not None:
+            stats.count("calculate_entropy")
+            if guess in self.entropy_cache:
+                stats.count("entropy_cache_hits")
+            start = time.perf_counter()
+
         if guess in self.entropy_cache:
             return self.entropy_cache[guess]
 
-        pattern_counts = {}
-
-        for word in possible_words:
-            pattern = get_answer(guess, word)  # Simulate the pattern for this guess
-            if pattern not in pattern_counts:
-                pattern_counts[pattern] = 0
-            pattern_counts[pattern] += 1
+        pattern_counts = self.count_patterns(guess, possible_words)
 
         entropy = 0.0
         total_words = len(possible_words)
@@ -199,8 +2007,62 @@ class Game:
             entropy -= probability * math.log2(probability)
 
         self.entropy_cache[guess] = entropy
+
+        if stats is not None:
+            stats.add_time("calculate_entropy", time.perf_counter() - start)
         return entropy
 
+    def count_patterns(self, guess: str, possible_words: list[str]) -> dict:
+        """
+        Counts the possible words giving each pattern for the guess, in order of first appearance.
+
+        Returns:
+            dict: The count of each pattern, keyed by pattern code when looked up in the pattern matrix
+            and by pattern string when simulated.
+        """
+        stats = self.stats
+        matrix = get_pattern_matrix() if self.use_pattern_matrix else None
+
+        if matrix is not None and guess in word_ids:
+            # Look the patterns up instead of simulating them, counted in order of first appearance
+            # so entropies are bit-for-bit the same as with the get_answer path below
+            answer_ids = self.get_answer_ids(possible_words)
+            if stats is not None:
+                stats.count("pattern_lookups", len(answer_ids))
+            codes = matrix[word_ids[guess]][answer_ids]
+            codes, first_seen, counts = np.unique(
+                codes, return_index=True, return_counts=True
+            )
+            order = np.argsort(first_seen)
+            return dict(zip(codes[order].tolist(), counts[order].tolist()))
+
+        pattern_counts = {}
+
+        for word in possible_words:
+            pattern = get_answer(guess, word)  # Simulate the pattern for this guess
+            if pattern not in pattern_counts:
+                pattern_counts[pattern] = 0
+            pattern_counts[pattern] += 1
+
+        if stats is not None:
+            stats.count("get_answer", len(possible_words))
+        return pattern_counts
+
+    def calculate_cost(self, guess: str, possible_words: list[str]) -> float:
+        """
+        Calculates the cost of a guess under the current bucket scoring mode, as get_scoring_costs does
+        for many guesses.
+        """
+        counts = self.count_patterns(guess, possible_words)
+        counts.pop(WIN_CODE, None)
+        counts.pop("ggggg", None)
+
+        largest = max(counts.values(), default=0)
+        squares = sum(count * count for count in counts.values())
+        return float(
+            get_scoring_costs(largest, squares, len(possible_words), self.scoring)
+        )
+
     def get_entropy_frequency_weights(
         self,
         remaining_words_count: int,
@@ -228,52 +2090,311 @@ class Game:
         return entropy_weight, frequency_weight
 
     def play(self, guess: str, answer: str):
+        guess = guess.lower()
+        if not GUESS_PATTERN.fullmatch(guess) or len(answer) != 5:
+            raise ValueError(f"invalid move: {guess} {answer}")
+
         self.guesses.append(guess)
         self.patterns.append(answer)
 
-        if guess not in self.known_not_words:
-            self.known_not_words.add(guess)
+        # Only the survivors of the previous turn can still match, and cached entropies no longer apply
+        self._candidate_bits &= get_pattern_bits(guess, answer, len(self.guesses) - 1)
+        if guess in word_ids:
+            self._candidate_bits &= ~(1 << word_ids[guess])
+
+        if self._candidate_bits == get_all_bits():
+            self.candidates = possible_guesses
+            self._candidate_ids = None
+        else:
+            indices = get_bit_indices(self._candidate_bits)
+            self.candidates = [possible_guesses[i] for i in indices]
+            self._candidate_ids = (
+                np.array(indices, dtype=np.intp) if np is not None else None
+            )
+        self._candidate_fingerprint = None
+        self.entropy_cache = {}
+
+        if self._answer_pool is not None:
+            self.narrow_answer_pool(guess, answer)
+
+        self._legal_bits &= get_hard_mode_bits(guess, answer)
+        self._hard_mode_guesses = None
 
         for i, char in enumerate(guess):
+            letter = ord(char) - 97
             if answer[i] == "-":
-                self.not_possible_chars.add(char)
+                self._greys |= 1 << letter
             elif answer[i] == "y":
-                obj = {"char": char, "index": i}
-                if obj not in self.unknown:
-                    self.unknown.append(obj)
+                self._yellows |= 1 << (i * 26 + letter)
             else:
-                self.known[i] = char
-                self.unknown[:] = [
-                    obj
-                    for obj in self.unknown
-                    if obj["char"] != char or obj["index"] == i
-                ]
+                self._greens = self._greens & ~(31 << (5 * i)) | (letter + 1) << (5 * i)
+                # A green letter is no longer yellow anywhere else
+                self._yellows &= ~(YELLOW_POSITIONS << letter) | 1 << (i * 26 + letter)
 
     def play_all(self, guesses: list[str], answers: list[str]):
         for guess, answer in zip(guesses, answers):
             self.play(guess, answer)
 
-    def rank_all_guesses(self, guesses: list[str]) -> str:
+    def set_position(self, patterns: list[str], guesses: list[str]):
         """
-        Rank all guesses in parallel using concurrent processing to speed up the ranking process.
+        Sets the game to the given position, only playing the moves that extend the current one.
+
+        Args:
+            patterns (list[str]): The patterns of the position.
+            guesses (list[str]): The guesses of the position.
         """
-        best_score = -math.inf
-        best_guess = None
+        played = len(self.guesses)
+        if guesses[:played] != self.guesses or patterns[:played] != self.patterns:
+            self.clean()
+            played = 0
 
-        with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
-            future_to_guess = {
-                executor.submit(self.rank_guess, guess): guess for guess in guesses
-            }
+        self.play_all(guesses[played:], patterns[played:])
+
+    def get_answer_pool(self) -> list[str]:
+        """
+        Returns the words of answers.txt that give the played patterns for every played guess.
+
+        Unlike the candidates, the pool is narrowed by the exact feedback of get_answer (looked up in the
+        pattern matrix when it is available).
+        """
+        if self._answer_pool is None:
+            if (
+                np is not None
+                and self.use_pattern_matrix
+                and get_pattern_matrix() is not None
+            ):
+                self._answer_pool_ids = get_answer_word_ids()
+                self._answer_pool = [possible_guesses[i] for i in self._answer_pool_ids]
+            else:
+                self._answer_pool = answers
+
+            for guess, pattern in zip(self.guesses, self.patterns):
+                self.narrow_answer_pool(guess, pattern)
+
+        return self._answer_pool
+
+    def narrow_answer_pool(self, guess: str, pattern: str):
+        """
+        Removes the answers of the pool that would not give the pattern for the guess.
+        """
+        self._answer_pool_set = None
+        if self._answer_pool_ids is not None and guess in word_ids:
+            codes = get_pattern_matrix()[word_ids[guess]][self._answer_pool_ids]
+            self._answer_pool_ids = self._answer_pool_ids[
+                codes == encode_pattern(pattern)
+            ]
+            self._answer_pool = [possible_guesses[i] for i in self._answer_pool_ids]
+        else:
+            self._answer_pool = [
+                word for word in self._answer_pool if get_answer(guess, word) == pattern
+            ]
+            if self._answer_pool_ids is not None:
+                self._answer_pool_ids = np.array(
+                    [word_ids[word] for word in self._answer_pool], dtype=np.intp
+                )
+
+    def is_in_answer_pool(self, word: str) -> bool:
+        if self._answer_pool_set is None:
+            self._answer_pool_set = set(self.get_answer_pool())
+        return word in self._answer_pool_set
+
+    def get_guess_pool(self) -> list[str]:
+        """
+        Returns the words best_guess chooses from: every word in answer pool mode, otherwise the
+        candidates narrowed by play(), or every word once no candidate is left. Hard mode only keeps
+        the words allowed by its rules.
+        """
+        if self.hard_mode:
+            return self.get_hard_mode_guesses()
+
+        if self.use_answer_pool and self.get_answer_pool():
+            return possible_guesses
+
+        return self.candidates or possible_guesses
+
+    def get_hard_mode_guesses(self) -> list[str]:
+        """
+        Returns the guess pool in hard mode, the same list until the next move so rankings can be cached.
+        """
+        if self._hard_mode_guesses is None:
+            bits = self._legal_bits
+            if not (self.use_answer_pool and self.get_answer_pool()):
+                bits = bits & self._candidate_bits or bits
+
+            if bits == get_all_bits():
+                self._hard_mode_guesses = possible_guesses
+            else:
+                self._hard_mode_guesses = [
+                    possible_guesses[i] for i in get_bit_indices(bits)
+                ]
+
+        return self._hard_mode_guesses
+
+    def get_possible_words(self) -> list[str]:
+        """
+        Returns the words entropy is calculated over: the answer pool in answer pool mode, otherwise the
+        candidates, or every word once no candidate is left.
+        """
+        if self.use_answer_pool and self.get_answer_pool():
+            return self._answer_pool
+
+        return self.candidates or possible_guesses
+
+    def get_position_key(self, discard_guesses_not_in_freqs: bool = True) -> tuple:
+        """
+        Returns a key identifying everything that affects the ranking of the current position.
+        """
+        if self._candidate_fingerprint is None:
+            self._candidate_fingerprint = hashlib.blake2b(
+                self._candidate_bits.to_bytes(-(-len(possible_guesses) // 8), "little"),
+                digest_size=16,
+            ).digest()
+
+        # The answer pool is not determined by the candidates, so it is part of the key in its mode
+        pool_fingerprint = None
+        if self.use_answer_pool:
+            pool_fingerprint = hashlib.blake2b(
+                "".join(self.get_answer_pool()).encode("ascii"), digest_size=16
+            ).digest()
+
+        # The hard mode guess pool depends on the patterns, which are not part of the key otherwise
+        legal_fingerprint = None
+        if self.hard_mode:
+            legal_fingerprint = hashlib.blake2b(
+                self._legal_bits.to_bytes(-(-len(possible_guesses) // 8), "little"),
+                digest_size=16,
+            ).digest()
+
+        return (
+            self._candidate_fingerprint,
+            pool_fingerprint,
+            legal_fingerprint,
+            self._greys,
+            tuple(sorted(set(self.guesses))),
+            discard_guesses_not_in_freqs,
+            (
+                (self.sample_error, self.sample_top_k, self.sample_seed)
+                if self.use_sampling
+                else None
+            ),
+            self.scoring,
+        )
 
-            for future in concurrent.futures.as_completed(future_to_guess):
-                guess = future_to_guess[future]
-                score = future.result()
+    def rank_all_guesses(
+        self, guesses: list[str], discard_guesses_not_in_freqs: bool = True
+    ) -> str | None:
+        """
+        Rank all guesses and return the best one, splitting the work across self.workers processes.
+
+        Args:
+            guesses (list[str]): The guesses to rank.
+            discard_guesses_not_in_freqs (bool): Whether to penalize guesses not in the frequency list.
+
+        Returns:
+            str | None: The best guess (the first one on ties), or None if every guess is impossible.
+        """
+        return self.rank_position(guesses, discard_guesses_not_in_freqs)[2]
+
+    def rank_position(
+        self, guesses: list[str], discard_guesses_not_in_freqs: bool = True
+    ) -> tuple[list[str], list[float], str | None]:
+        """
+        Scores all guesses, reusing the ranking from the shared cache when the position was seen before.
+
+        Args:
+            guesses (list[str]): The guesses to rank.
+            discard_guesses_not_in_freqs (bool): Whether to penalize guesses not in the frequency list.
+
+        Returns:
+            tuple[list[str], list[float], str | None]: The guesses, their scores and the best guess.
+        """
+        # Only the guess pool of the current position is determined by the position key
+        key = None
+        if self.ranking_cache is not None and guesses is self.get_guess_pool():
+            key = self.get_position_key(discard_guesses_not_in_freqs)
+            ranking = self.ranking_cache.get(key)
+            if self.stats is not None:
+                self.stats.count(
+                    "ranking_cache_misses" if ranking is None else "ranking_cache_hits"
+                )
+                if ranking is not None:
+                    self.stats.source = "cache"
+            if ranking is not None:
+                return ranking
+
+        matrix = get_pattern_matrix() if self.use_pattern_matrix else None
+        frequency_multiplier = 10 if discard_guesses_not_in_freqs else 1
 
+        if matrix is not None and self.use_vectorized:
+            scores = self.rank_guesses_vectorized(
+                matrix, guesses, frequency_multiplier, discard_guesses_not_in_freqs
+            )
+            best_guess = self.best_guess_vectorized(
+                guesses, scores, discard_guesses_not_in_freqs
+            )
+        else:
+            scores = self.rank_guesses(guesses, discard_guesses_not_in_freqs)
+            best_score = -math.inf
+            best_guess = None
+
+            for guess, score in zip(guesses, scores):
                 if score > best_score:
                     best_score = score
                     best_guess = guess
 
-        return best_guess
+        ranking = guesses, scores, best_guess
+        if key is not None:
+            self.ranking_cache.put(key, ranking)
+        return ranking
+
+    def rank_guesses(
+        self, guesses: list[str], discard_guesses_not_in_freqs: bool = True
+    ) -> list[float]:
+        """
+        Scores the guesses with rank_guess, splitting them across self.workers processes.
+        """
+        frequency_multiplier = 10 if discard_guesses_not_in_freqs else 1
+
+        if self.workers > 1:
+            # Chunks keep their order, so the merged scores match a single pass exactly
+            chunk_size = -(-len(guesses) // self.workers)
+            futures = [
+                get_ranking_pool(self.workers).submit(
+                    rank_guesses_chunk,
+                    self,
+                    guesses[start : start + chunk_size],
+                    frequency_multiplier,
+                    discard_guesses_not_in_freqs,
+                )
+                for start in range(0, len(guesses), chunk_size)
+            ]
+            return [score for future in futures for score in future.result()]
+
+        return [
+            self.rank_guess(guess, frequency_multiplier, discard_guesses_not_in_freqs)
+            for guess in guesses
+        ]
+
+    def get_entropies(
+        self,
+        matrix: "np.ndarray",
+        guess_ids: "np.ndarray",
+        answer_ids: "np.ndarray",
+        population: int | None = None,
+    ) -> "np.ndarray":
+        """
+        Calculates the entropies of the guesses, splitting the guesses across self.workers processes.
+        """
+        if self.workers <= 1 or len(guess_ids) < self.workers:
+            return get_entropies(matrix, guess_ids, answer_ids, population=population)
+
+        futures = [
+            get_ranking_pool(self.workers).submit(
+                get_entropies_chunk, chunk, answer_ids, population
+            )
+            for chunk in np.array_split(guess_ids, self.workers)
+        ]
+        return np.concatenate([future.result() for future in futures])
 
     def rank_guess(
         self,
@@ -281,18 +2402,26 @@ class Game:
         frequency_multiplier: float = 10.0,
         discard_guesses_not_in_freqs: bool = True,
     ) -> float:
-        if not guess or guess in self.known_not_words:
+        stats = self.stats
+        if stats is not None:
+            stats.count("rank_guess")
+            start = time.perf_counter()
+
+        if not guess or guess in self.guesses:
             return -math.inf
 
-        if any(char in self.not_possible_chars for char in guess):
+        # Any valid guess can probe the answer pool
+        answer_pool = self.use_answer_pool and self.get_answer_pool()
+        if not answer_pool and get_letter_mask(guess) & self._greys:
             return -math.inf  # Early return for impossible guesses
 
-        possible_words = self.get_words_from_pattern(self.patterns, self.guesses)
-        if not possible_words:
-            # print(
-            #     f"{Fore.RED}Error: No possible words found for guess: {guess}. Using all possible words.{Style.RESET_ALL}"
-            # )
-            possible_words = possible_guesses
+        possible_words = self.get_possible_words()
+
+        if self.scoring != "entropy":
+            score = -self.calculate_cost(guess, possible_words)
+            if stats is not None:
+                stats.add_time("rank_guess", time.perf_counter() - start)
+            return score
 
         # Skip guesses that are not in the frequency list
         score_penalty = 0
@@ -302,11 +2431,10 @@ class Game:
         # Calculate entropy for the guess, but skip already invalid guesses
         entropy = self.calculate_entropy(guess, possible_words)
 
-        # Calculate frequency score
-        frequency_score = float(freqs.get(guess, 0.075)) * frequency_multiplier
+        frequency_score = self.get_frequency_score(guess, frequency_multiplier)
 
         # Get dynamic weights
-        total_words_count = len(possible_guesses)
+        total_words_count = len(answers) if answer_pool else len(possible_guesses)
         remaining_words_count = len(possible_words)
         entropy_weight, frequency_weight = self.get_entropy_frequency_weights(
             remaining_words_count, total_words_count
@@ -319,45 +2447,484 @@ class Game:
             - score_penalty
         )
 
+        if stats is not None:
+            stats.add_time("rank_guess", time.perf_counter() - start)
         return score
 
-    def best_guess(self, discard_guesses_not_in_freqs: bool = True) -> str | None:
-        if not self.guesses:
-            return self.starting_word
+    def get_frequency_score(
+        self, guess: str, frequency_multiplier: float = 10.0
+    ) -> float:
+        """
+        Returns the frequency score of a guess, which in answer pool mode only favors the guesses that can win.
+        """
+        if self.use_answer_pool and self.get_answer_pool():
+            if not self.is_in_answer_pool(guess):
+                return 0.0
 
-        best_score = -math.inf
-        best_guess = None
+        return float(freqs.get(guess, 0.075)) * frequency_multiplier
 
-        # Get possible guesses from current patterns and guesses
-        guesses = self.get_words_from_pattern(self.patterns, self.guesses)
+    def analyze(self, count: int) -> list[dict]:
+        """
+        Returns the top guesses of the current position's ranking, the one best_guess searches.
 
-        # If no words match the pattern, use the full possible guess list
-        if not guesses:
-            guesses = possible_guesses
+        With the default settings, the blank position and the opening book's positions are answered from
+        the rows stored in the book. Otherwise the ranking comes from rank_position, so it is shared with
+        best_guess through the ranking cache, and only the top guesses are selected and broken down. The
+        solution tree, the book's guesses and lookahead are not consulted, so their guess may differ from
+        the first one.
 
-        if not guesses:
-            print(f"{Fore.RED}Ran out of guesses{Style.RESET_ALL}")
+        Args:
+            count (int): The number of guesses to return.
+
+        Returns:
+            list[dict]: The guesses, best first, with their entropy, weighted frequency component (0 in
+            the bucket scoring modes) and score.
+        """
+        if (
+            self.use_opening_book
+            and self.uses_default_search()
+            and 0 < count <= ANALYSIS_ROWS
+        ):
+            rows = get_opening_analysis().get(
+                self.encode_pwn(self.patterns, self.guesses)
+            )
+            if rows is not None:
+                return [dict(row) for row in rows[:count]]
+
+        guesses = self.get_guess_pool()
+        if not guesses or count <= 0:
+            return []
+
+        discard_guesses_not_in_freqs = True
+        guesses, scores, best_guess = self.rank_position(
+            guesses, discard_guesses_not_in_freqs
+        )
+        if best_guess is None:
+            discard_guesses_not_in_freqs = False
+            guesses, scores, best_guess = self.rank_position(
+                self.get_guess_pool(), discard_guesses_not_in_freqs
+            )
+
+        # Select the top guesses without sorting the whole ranking, earlier guesses first on ties
+        if np is not None and isinstance(scores, np.ndarray):
+            count = min(count, len(scores))
+            top = np.argpartition(-scores, count - 1)[:count]
+            top = top[np.lexsort((top, -scores[top]))]
+        else:
+            top = heapq.nlargest(count, range(len(scores)), key=scores.__getitem__)
+        top = [int(index) for index in top if scores[index] > -math.inf]
+
+        frequency_multiplier = 10 if discard_guesses_not_in_freqs else 1
+        possible_words = self.get_possible_words()
+        entropy_weight, frequency_weight = self.get_entropy_frequency_weights(
+            len(possible_words),
+            (
+                len(answers)
+                if possible_words is self._answer_pool
+                else len(possible_guesses)
+            ),
+        )
+
+        return [
+            {
+                "guess": guesses[index],
+                "entropy": self.calculate_entropy(guesses[index], possible_words),
+                "frequency": (
+                    frequency_weight
+                    * self.get_frequency_score(guesses[index], frequency_multiplier)
+                    if self.scoring == "entropy"
+                    else 0.0
+                ),
+                "score": float(scores[index]),
+            }
+            for index in top
+        ]
+
+    def rank_guesses_vectorized(
+        self,
+        matrix: "np.ndarray",
+        guesses: list[str],
+        frequency_multiplier: float = 10.0,
+        discard_guesses_not_in_freqs: bool = True,
+    ) -> "np.ndarray":
+        """
+        Scores every guess at once with the same formula as rank_guess.
+
+        Args:
+            matrix (np.ndarray): The pattern matrix.
+            guesses (list[str]): The guesses to score.
+            frequency_multiplier (float): The multiplier applied to the word frequencies.
+            discard_guesses_not_in_freqs (bool): Whether to penalize guesses not in the frequency list.
+
+        Returns:
+            np.ndarray: The score of each guess, -inf for impossible guesses.
+        """
+        if self.stats is not None:
+            start = time.perf_counter()
+
+        possible_words = self.get_possible_words()
+        answer_pool = possible_words is self._answer_pool
+        guess_ids = self.get_answer_ids(guesses)
+        answer_ids = self.get_answer_ids(possible_words)
+        frequencies, in_freqs, letter_masks = get_word_arrays()
+
+        # Rule out impossible guesses first so no entropy is calculated for them, any valid guess
+        # can probe the answer pool
+        not_possible_mask = 0 if answer_pool else self._greys
+        possible = (letter_masks[guess_ids] & not_possible_mask) == 0
+        if self.guesses:
+            possible &= ~np.isin(
+                guess_ids,
+                [word_ids[word] for word in self.guesses if word in word_ids],
+            )
+        guess_ids = guess_ids[possible]
+
+        if self.scoring != "entropy":
+            # Bucket modes look at every answer, since a sample would miss the worst buckets
+            _, largest, squares = get_bucket_stats(matrix, guess_ids, answer_ids)
+            scores = np.full(len(guesses), -math.inf)
+            scores[possible] = -get_scoring_costs(
+                largest, squares, len(answer_ids), self.scoring
+            )
+
+            if self.stats is not None:
+                self.stats.count("vectorized_entropies", len(guess_ids))
+                self.stats.count("pattern_lookups", len(guess_ids) * len(answer_ids))
+                self.stats.add_time(
+                    "rank_guesses_vectorized", time.perf_counter() - start
+                )
+            return scores
+
+        # Estimate the entropies from a sample of the answers when that is accurate enough
+        sample_size = len(answer_ids)
+        if self.use_sampling:
+            sample_size = min(
+                sample_size, get_sample_size(len(answer_ids), self.sample_error)
+            )
+        sampled = 2 * sample_size <= len(answer_ids)
+        if sampled:
+            sample_ids = sample_answer_ids(answer_ids, sample_size, self.sample_seed)
+            entropies = self.get_entropies(
+                matrix, guess_ids, sample_ids, len(answer_ids)
+            )
+        else:
+            entropies = self.get_entropies(matrix, guess_ids, answer_ids)
+
+        frequency_scores = frequencies[guess_ids] * frequency_multiplier
+        if answer_pool:
+            # Only the guesses that can win are favored for their frequency
+            frequency_scores *= np.isin(guess_ids, answer_ids)
+
+        entropy_weight, frequency_weight = self.get_entropy_frequency_weights(
+            len(possible_words), len(answers) if answer_pool else len(possible_guesses)
+        )
+
+        possible_scores = (entropy_weight * entropies) + (
+            frequency_weight * frequency_scores
+        )
+        if discard_guesses_not_in_freqs:
+            possible_scores -= np.where(in_freqs[guess_ids], 0, 100)
+
+        if sampled:
+            # Only the shortlist of the best estimates is scored exactly, the others keep their estimates
+            top_k = min(self.sample_top_k, len(guess_ids))
+            top = np.argpartition(-possible_scores, top_k - 1)[:top_k]
+            exact = self.get_entropies(matrix, guess_ids[top], answer_ids)
+            possible_scores[top] += entropy_weight * (exact - entropies[top])
+
+        scores = np.full(len(guesses), -math.inf)
+        scores[possible] = possible_scores
+
+        if self.stats is not None:
+            self.stats.count("vectorized_entropies", len(guess_ids))
+            self.stats.count("pattern_lookups", len(guess_ids) * sample_size)
+            if sampled:
+                self.stats.count("sampled_rankings")
+                self.stats.count("pattern_lookups", top_k * len(answer_ids))
+            self.stats.add_time("rank_guesses_vectorized", time.perf_counter() - start)
+        return scores
+
+    def best_guess_vectorized(
+        self,
+        guesses: list[str],
+        scores: "np.ndarray",
+        discard_guesses_not_in_freqs: bool = True,
+    ) -> str | None:
+        """
+        Picks the same best guess from vectorized scores as the rank_guess loop would.
+        """
+        frequency_multiplier = 10 if discard_guesses_not_in_freqs else 1
+
+        best_score = scores.max()
+        if best_score == -math.inf:
             return None
 
-        # Find the best guess based on rank (entropy + frequency combined)
-        for guess in guesses:
+        # Entropies summed in a different order can differ in the last bits, so near ties are
+        # settled by rank_guess to pick exactly what the scalar loop picks
+        near_best = np.flatnonzero(scores >= best_score - 1e-9)
+        if len(near_best) == 1:
+            return guesses[near_best[0]]
+
+        best_score = -math.inf
+        best_guess = None
+        for index in near_best:
             score = self.rank_guess(
-                guess,
-                10 if discard_guesses_not_in_freqs else 1,
-                discard_guesses_not_in_freqs,
+                guesses[index], frequency_multiplier, discard_guesses_not_in_freqs
             )
             if score > best_score:
                 best_score = score
+                best_guess = guesses[index]
+
+        return best_guess
+
+    def lookahead_guess(
+        self, guesses: list[str], scores: list[float], best_guess: str | None
+    ) -> str | None:
+        """
+        Re-ranks the top guesses of a ranking by the expected number of guesses to solve two plies ahead.
+
+        Guesses are evaluated best-ranked first, starting with the ranking's own pick, until all
+        self.lookahead_top_k are done or self.lookahead_time runs out, so the result is always the best
+        one evaluated so far.
+
+        Args:
+            guesses (list[str]): The ranked guesses.
+            scores (list[float]): Their scores.
+            best_guess (str | None): The best guess of the ranking.
+
+        Returns:
+            str | None: The guess with the fewest expected guesses, or best_guess if none beats it.
+        """
+        deadline = time.perf_counter() + self.lookahead_time
+        matrix = get_pattern_matrix() if self.use_pattern_matrix else None
+
+        # Without candidates left there is nothing to look ahead over
+        possible_words = self.get_possible_words()
+        if (
+            matrix is None
+            or best_guess not in word_ids
+            or possible_words is possible_guesses
+            or len(possible_words) <= 2
+        ):
+            return best_guess
+        answer_ids = self.get_answer_ids(possible_words)
+
+        if self.stats is not None:
+            start = time.perf_counter()
+
+        # The best-ranked guesses, in order, are both the shortlist and the second guesses tried
+        scores = np.asarray(scores, dtype=float)
+        top_k = min(max(self.lookahead_top_k, LOOKAHEAD_PROBES), len(scores))
+        top = np.argpartition(-scores, top_k - 1)[:top_k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        top = [
+            guesses[i] for i in top if scores[i] > -math.inf and guesses[i] in word_ids
+        ]
+        probe_ids = np.array([word_ids[guess] for guess in top], dtype=np.intp)
+        shortlist = [best_guess] + [
+            guess for guess in top[: self.lookahead_top_k] if guess != best_guess
+        ]
+
+        best_expected = math.inf
+        for guess in shortlist:
+            expected = self.get_lookahead_guesses(
+                matrix, word_ids[guess], answer_ids, probe_ids, best_expected, deadline
+            )
+            if expected is None:
+                break
+            if self.stats is not None:
+                self.stats.count("lookahead_guesses")
+            if expected < best_expected:
+                best_expected = expected
                 best_guess = guess
 
+        if self.stats is not None:
+            self.stats.add_time("lookahead", time.perf_counter() - start)
+        return best_guess
+
+    def get_lookahead_guesses(
+        self,
+        matrix: "np.ndarray",
+        guess_id: int,
+        answer_ids: "np.ndarray",
+        probe_ids: "np.ndarray",
+        bound: float,
+        deadline: float,
+    ) -> float | None:
+        """
+        Calculates the expected number of guesses to solve the answers when playing a guess, followed by
+        the best second guess for each pattern it can get.
+
+        The second guesses tried are the probes and the answers left after the pattern, any of which
+        can win at once.
+
+        Patterns are expanded largest first, the others counting their lower bound until then, and the
+        search stops as soon as the guess cannot beat the bound.
+
+        Args:
+            matrix (np.ndarray): The pattern matrix.
+            guess_id (int): The row id of the guess.
+            answer_ids (np.ndarray): The column ids of the possible answers.
+            probe_ids (np.ndarray): The row ids of the second guesses to try besides the answers left.
+            bound (float): The expected number of guesses of the best guess so far.
+            deadline (float): The time.perf_counter() value at which to give up.
+
+        Returns:
+            float | None: The expected number of guesses (a lower bound of it if the guess cannot beat
+            bound), or None if the deadline passed first.
+        """
+        codes = matrix[guess_id][answer_ids]
+        order = np.argsort(codes, kind="stable")
+        codes = codes[order]
+        splits = np.flatnonzero(np.diff(codes)) + 1
+        buckets = [
+            answer_ids[bucket]
+            for bucket, code in zip(np.split(order, splits), codes[np.r_[0, splits]])
+            if code != WIN_CODE
+        ]
+        buckets.sort(key=len, reverse=True)
+
+        # One candidate takes one more guess and two take 1.5, more take at least (2n - 1) / n
+        sizes = np.array([len(bucket) for bucket in buckets], dtype=float)
+        lower_bounds = np.where(sizes > 1, (2 * sizes - 1) / sizes, 1.0)
+        expected = 1 + (sizes * lower_bounds).sum() / len(answer_ids)
+
+        for bucket, size, lower_bound in zip(buckets, sizes, lower_bounds):
+            if expected >= bound or size <= 2:
+                break
+            if time.perf_counter() > deadline:
+                return None
+
+            second_ids = np.concatenate((probe_ids, bucket))
+            second = get_expected_guesses(matrix, second_ids, bucket).min()
+            expected += size * (second - lower_bound) / len(answer_ids)
+
+        return expected
+
+    def can_solve_within(
+        self, guesses_left: int, guess: str | None = None, width: int | None = 20
+    ) -> bool:
+        """
+        Returns whether every word left can surely be solved within guesses_left more guesses.
+
+        Args:
+            guesses_left (int): The number of guesses allowed, counting guess.
+            guess (str | None): A guess to play first, to certify a starting word.
+            width (int | None): The number of guesses tried at each position, see can_solve_within.
+
+        Returns:
+            bool: Whether a strategy was found. False is only a proof when width is None.
+
+        Raises:
+            RuntimeError: If the pattern matrix is not available, or in hard mode, whose allowed guesses
+                change with every pattern.
+        """
+        matrix = get_pattern_matrix()
+        if np is None or matrix is None:
+            raise RuntimeError("Checking solvability needs the pattern matrix")
+        if self.hard_mode:
+            raise RuntimeError("Checking solvability is not supported in hard mode")
+
+        answer_ids = self.get_answer_ids(self.get_possible_words())
+        return can_solve_within(
+            matrix,
+            answer_ids,
+            guesses_left,
+            width=width,
+            first_guess=word_ids[guess] if guess is not None else None,
+        )
+
+    def get_tree_guess(self) -> str | None:
+        """
+        Looks the current position up in the solution tree.
+
+        Returns:
+            str | None: The guess stored for the position, or None if the tree does not reach it.
+        """
+        node = get_solution_tree()
+
+        for guess, pattern in zip(self.guesses, self.patterns):
+            if node is None or node[0] != guess:
+                return None
+            node = node[1].get(pattern)
+
+        return node[0] if node else None
+
+    def best_guess(self, discard_guesses_not_in_freqs: bool = True) -> str | None:
+        if self.stats is None:
+            return self.find_best_guess(discard_guesses_not_in_freqs)
+
+        calls_before = dict(self.stats.calls)
+        start = time.perf_counter()
+        guess = self.find_best_guess(discard_guesses_not_in_freqs)
+        self.stats.record_turn(
+            len(self.guesses),
+            len(self.candidates),
+            time.perf_counter() - start,
+            guess,
+            calls_before,
+        )
+        return guess
+
+    def find_best_guess(self, discard_guesses_not_in_freqs: bool = True) -> str | None:
+        if not self.guesses:
+            if self.stats is not None:
+                self.stats.source = "start"
+            return self.starting_word
+
+        # The solution tree and opening book are built with the default settings, so they only answer those
+        if self.use_solution_tree and self.uses_default_search(
+            discard_guesses_not_in_freqs
+        ):
+            tree_guess = self.get_tree_guess()
+            if tree_guess:
+                if self.stats is not None:
+                    self.stats.source = "tree"
+                return tree_guess
+
+        if self.use_opening_book and self.uses_default_search(
+            discard_guesses_not_in_freqs
+        ):
+            book_guess = get_opening_book().get(
+                self.encode_pwn(self.patterns, self.guesses)
+            )
+            if book_guess:
+                if self.stats is not None:
+                    self.stats.source = "book"
+                return book_guess
+
+        # With one or two answers left, guessing one of them is best
+        if self.use_answer_pool and 0 < len(self.get_answer_pool()) <= 2:
+            if self.stats is not None:
+                self.stats.source = "search"
+            return max(self.get_answer_pool(), key=lambda word: freqs.get(word, 0))
+
+        guesses = self.get_guess_pool()
+
+        if not guesses:
+            if self.debug:
+                print(f"{Fore.RED}Ran out of guesses{Style.RESET_ALL}")
+            return None
+
+        # Find the best guess based on rank (entropy + frequency combined)
+        if self.stats is not None:
+            self.stats.source = "search"
+        if self.use_lookahead:
+            ranking = self.rank_position(guesses, discard_guesses_not_in_freqs)
+            best_guess = self.lookahead_guess(*ranking)
+        else:
+            best_guess = self.rank_all_guesses(guesses, discard_guesses_not_in_freqs)
+
         if best_guess is None:
             if discard_guesses_not_in_freqs:
-                print(
-                    f"{Fore.RED}Ran out of guesses so switching to not discard guesses not in the frequency list{Style.RESET_ALL}"
-                )
-                return self.best_guess(False)
-
-            print(f"{Fore.RED}Ran out of guesses{Style.RESET_ALL}")
+                if self.debug:
+                    print(
+                        f"{Fore.RED}Ran out of guesses so switching to not discard guesses not in the frequency list{Style.RESET_ALL}"
+                    )
+                return self.find_best_guess(False)
+
+            if self.debug:
+                print(f"{Fore.RED}Ran out of guesses{Style.RESET_ALL}")
             return None
 
         return best_guess
@@ -406,3 +2973,266 @@ class Game:
             rep += line + "  " + colorful_rep.split("\n")[i] + "\n"
 
         return rep
+
+
+class MultiGame:
+    """
+    Plays several boards at once, like Dordle or Quordle: every guess is played on each unsolved board.
+
+    Each board is a Game narrowed by its own patterns, and guesses are chosen by their joint entropy over
+    the unsolved boards, computed for all boards in one pass over the pattern matrix.
+    """
+
+    # Settings changed with the UWI command "set NAME VALUE": option name -> (attribute, type)
+    OPTIONS = {
+        "answer_pool": ("use_answer_pool", bool),
+        "sampling": ("use_sampling", bool),
+        "sample_error": ("sample_error", positive_float),
+        "sample_k": ("sample_top_k", positive_int),
+        "sample_seed": ("sample_seed", int),
+    }
+
+    def __init__(self, boards: int = 4):
+        load_word_data()
+
+        self.starting_word = "salet"
+        self.guesses = []
+
+        # Score entropy over the answers left on each board instead of every word left. On by default:
+        # every board must be solved, and the candidates narrowed by Game.play can lose a board's answer
+        self.use_answer_pool = True
+
+        # Estimate joint entropies from a sample of the answers of each board large enough to sample, as
+        # in Game. On by default, since every board adds its answers to each guess's pass
+        self.use_sampling = True
+        self.sample_error = 0.25
+        self.sample_top_k = 50
+        self.sample_seed = 0
+
+        self.debug = True
+
+        self.boards = []
+        self.set_boards(boards)
+
+    def set_boards(self, count: int):
+        """
+        Starts a new game with the given number of boards.
+        """
+        self.guesses = []
+        self.boards = [self.new_board() for _ in range(count)]
+
+    def new_board(self) -> Game:
+        board = Game()
+        board.debug = False
+        board.use_answer_pool = self.use_answer_pool
+        return board
+
+    @staticmethod
+    def is_solved(board: Game) -> bool:
+        return bool(board.patterns) and board.patterns[-1] == "ggggg"
+
+    def get_unsolved_boards(self) -> list[Game]:
+        return [board for board in self.boards if not self.is_solved(board)]
+
+    def play(self, guess: str, patterns: list[str]):
+        """
+        Plays a guess on every board, ignoring the patterns of boards that were already solved.
+
+        Args:
+            guess (str): The guess played.
+            patterns (list[str]): The pattern received on each board, in board order.
+        """
+        if len(patterns) != len(self.boards):
+            raise ValueError(
+                f"expected {len(self.boards)} patterns, got {len(patterns)}"
+            )
+
+        guess = guess.lower()
+        for board, pattern in zip(self.boards, patterns):
+            if not self.is_solved(board):
+                board.play(guess, pattern)
+        self.guesses.append(guess)
+
+    def set_positions(self, positions: list[tuple[list[str], list[str]]]):
+        """
+        Sets every board to its position, only playing the moves that extend the current ones.
+
+        Args:
+            positions (list[tuple[list[str], list[str]]]): The patterns and guesses of each board, as
+                returned by Game.decode_pwn. A solved board's position ends with its winning guess.
+
+        Raises:
+            ValueError: If the boards' guesses disagree, or a board stops before the others unsolved.
+        """
+        if len(positions) != len(self.boards):
+            raise ValueError(
+                f"expected {len(self.boards)} positions, got {len(positions)}"
+            )
+
+        # Every guess is played on each unsolved board, so the boards share one guess history
+        history = max((guesses for _, guesses in positions), key=len)
+        for i, (patterns, guesses) in enumerate(positions):
+            if guesses != history[: len(guesses)]:
+                raise ValueError(f"the guesses of board {i + 1} differ from the others")
+            if len(guesses) < len(history) and (
+                not patterns or patterns[-1] != "ggggg"
+            ):
+                raise ValueError(
+                    f"board {i + 1} stops before the others without being solved"
+                )
+
+        for board, (patterns, guesses) in zip(self.boards, positions):
+            board.use_answer_pool = self.use_answer_pool
+            board.set_position(patterns, guesses)
+        self.guesses = max((board.guesses for board in self.boards), key=len)[:]
+
+    def uwi_cmd(self, cmd: str) -> str:
+        """
+        Executes the given multi-board UWI (Universal Wordle Interface) command.
+
+        The commands are "boards N" to start a game of N boards, "mpos blank" or "mpos PWN|PWN|..." to set
+        the position of every board, "mmove GUESS PATTERN PATTERN ..." to play a guess with the pattern of
+        each board, "mguess" to get the best guess and "set NAME VALUE" for the OPTIONS.
+
+        Args:
+            cmd (str): The command to execute.
+
+        Returns:
+            str: The output of the command.
+        """
+        if self.debug:
+            print(f"{Fore.CYAN}Received UWI command: {cmd}{Style.RESET_ALL}")
+
+        if cmd == "uwi":
+            return "uwi2ok"
+        elif cmd.startswith("boards "):
+            try:
+                count = int(cmd[7:])
+            except ValueError:
+                return "boardserror"
+            if count < 1:
+                return "boardserror"
+            self.set_boards(count)
+            return "boardsok"
+        elif cmd.startswith("mpos "):
+            try:
+                position = cmd[5:]
+                if position == "blank":
+                    self.set_boards(len(self.boards))
+                else:
+                    self.set_positions(
+                        [self.boards[0].decode_pwn(pwn) for pwn in position.split("|")]
+                    )
+                return "mposok"
+            except Exception:
+                with open("error.log", "w") as f:
+                    f.write(traceback.format_exc())
+                print(
+                    f"{Fore.RED}Error while executing UWI command {cmd}. Check 'error.log' for details.{Style.RESET_ALL}"
+                )
+                return "mposerror"
+        elif cmd.startswith("mmove "):
+            move = cmd[6:].split(" ")
+            if len(move[0]) != 5 or any(len(pattern) != 5 for pattern in move[1:]):
+                return "mmoveerror"
+            try:
+                self.play(move[0], move[1:])
+                return "mmoveok"
+            except Exception:
+                with open("error.log", "w") as f:
+                    f.write(traceback.format_exc())
+                print(
+                    f"{Fore.RED}Error while executing UWI command {cmd}. Check 'error.log' for details.{Style.RESET_ALL}"
+                )
+                return "mmoveerror"
+        elif cmd == "mguess":
+            guess = self.best_guess()
+            return "mguessok\n" + guess if guess else "mguesserror"
+        elif cmd.startswith("set "):
+            option = cmd[4:].split(" ")
+            if len(option) != 2 or option[0] not in self.OPTIONS:
+                return "seterror"
+            attribute, option_type = self.OPTIONS[option[0]]
+            try:
+                setattr(self, attribute, parse_option(option[1], option_type))
+            except ValueError:
+                return "seterror"
+            return "setok"
+        elif cmd.startswith("win") or cmd.startswith("lose"):
+            return cmd + "ok"
+
+    def get_board_answer_ids(self, board: Game) -> "np.ndarray":
+        board.use_answer_pool = self.use_answer_pool
+        words = board.get_possible_words()
+        if board._answer_pool_ids is not None and words is board._answer_pool:
+            return board._answer_pool_ids
+        return board.get_answer_ids(words)
+
+    def best_guess(self) -> str | None:
+        """
+        Returns the guess with the highest joint entropy over the unsolved boards, plus the expected
+        number of boards it solves. A board left with a single word is solved first.
+        """
+        unsolved = self.get_unsolved_boards()
+        if not unsolved:
+            return None
+
+        if not self.guesses:
+            return self.starting_word
+
+        for board in unsolved:
+            board.use_answer_pool = self.use_answer_pool
+            words = board.get_possible_words()
+            if len(words) == 1:
+                return words[0]
+
+        matrix = get_pattern_matrix()
+        if np is None or matrix is None:
+            # Without the pattern matrix, solve the boards one at a time
+            return unsolved[0].best_guess()
+
+        board_ids = [self.get_board_answer_ids(board) for board in unsolved]
+
+        played = np.array(
+            [word_ids[guess] for guess in self.guesses if guess in word_ids]
+        )
+        guess_ids = np.setdiff1d(np.arange(len(possible_guesses)), played)
+
+        # A guess solves a board with the probability of being its answer
+        wins = np.zeros(len(guess_ids))
+        for ids in board_ids:
+            wins += np.isin(guess_ids, ids) / len(ids)
+
+        sample_ids = board_ids
+        if self.use_sampling:
+            sample_ids = []
+            for ids in board_ids:
+                size = get_sample_size(len(ids), self.sample_error)
+                sample_ids.append(
+                    sample_answer_ids(ids, size, self.sample_seed)
+                    if 2 * size <= len(ids)
+                    else ids
+                )
+
+        scores = (
+            get_joint_entropies(
+                matrix,
+                guess_ids,
+                sample_ids,
+                populations=[len(ids) for ids in board_ids],
+            )
+            + wins
+        )
+
+        if any(len(a) != len(b) for a, b in zip(sample_ids, board_ids)):
+            # Rescore the best estimates exactly
+            top_k = min(len(guess_ids), max(1, self.sample_top_k))
+            shortlist = np.argpartition(-scores, top_k - 1)[:top_k]
+            shortlist.sort()
+            scores = np.full(len(guess_ids), -np.inf)
+            scores[shortlist] = (
+                get_joint_entropies(matrix, guess_ids[shortlist], board_ids)
+                + wins[shortlist]
+            )
+
+        return possible_guesses[guess_ids[int(np.argmax(scores))]]
@@ -0,0 +1,225 @@
+import argparse
+import asyncio
+import concurrent.futures
+import contextlib
+import json
+import os
+import sys
+from colorama import Fore, Style
+
+import engine
+from engine import Game, MultiGame
+
+
+def solve_position(pwn: str, options: dict, cmd: str = "guess") -> str:
+    """
+    Answers a guess, analyze or solvable command for the given position in a worker process.
+
+    The worker keeps one game around, so consecutive positions from the same session only play the new moves.
+
+    Args:
+        pwn (str): The position.
+        options (dict): The session's settings, as returned by Game.get_options.
+        cmd (str): The command to answer.
+    """
+    game = engine.get_worker_game(options)
+
+    if pwn:
+        position = game.decode_pwn(pwn)
+        game.set_position(position[0], position[1])
+    else:
+        game.set_position([], [])
+
+    return game.uwi_cmd(cmd)
+
+
+class Session:
+    """A game played by one front-end, identified by its session ID."""
+
+    def __init__(self):
+        self.game = Game()
+        self.game.debug = False
+
+        # Commands of a session run one at a time, in the order they arrived
+        self.lock = asyncio.Lock()
+
+
+class UWIServer:
+    """
+    Serves UWI commands for many concurrent sessions over line-delimited JSON.
+
+    Each request is a line like {"id": 1, "session": "a", "cmd": "guess"} and is answered with a line like
+    {"id": 1, "session": "a", "result": "guessok\\nsalet"}. Requests can be pipelined: commands of the same
+    session run in order, while different sessions run concurrently and may be answered out of order.
+    """
+
+    def __init__(self, workers: int | None = None):
+        self.sessions = {}
+
+        engine.preload_tables()
+
+        self.executor = concurrent.futures.ProcessPoolExecutor(
+            max_workers=workers or os.cpu_count() or 1,
+            mp_context=engine.get_mp_context(),
+            initializer=engine.get_pattern_matrix,
+        )
+
+    async def execute(self, session_id: str, cmd: str) -> str:
+        """
+        Executes a UWI command for a session, sending the commands that search to the worker pool.
+        """
+        session = self.sessions.get(session_id)
+        if session is None:
+            if cmd == "quit":
+                return "quitok"
+            session = self.sessions[session_id] = Session()
+
+        async with session.lock:
+            if cmd == "quit":
+                self.sessions.pop(session_id, None)
+                return "quitok"
+
+            if cmd.startswith("boards "):
+                # The session switches to a multi-board game, searched in a thread of this process
+                if not isinstance(session.game, MultiGame):
+                    session.game = MultiGame()
+                    session.game.debug = False
+                return session.game.uwi_cmd(cmd)
+
+            if cmd == "mguess" and isinstance(session.game, MultiGame):
+                return await asyncio.get_running_loop().run_in_executor(
+                    None, session.game.uwi_cmd, cmd
+                )
+
+            if (
+                cmd == "guess" or cmd.startswith(("analyze ", "solvable "))
+            ) and isinstance(session.game, Game):
+                game = session.game
+                if game.stats is not None:
+                    # Sessions recording stats search in a thread of this process, where their stats live
+                    return await asyncio.get_running_loop().run_in_executor(
+                        None, game.uwi_cmd, cmd
+                    )
+
+                pwn = game.encode_pwn(game.patterns, game.guesses)
+                return await asyncio.get_running_loop().run_in_executor(
+                    self.executor, solve_position, pwn, game.get_options(), cmd
+                )
+
+            return session.game.uwi_cmd(cmd)
+
+    async def handle_line(self, line: str, write):
+        """
+        Handles one request line and writes its response line.
+        """
+        try:
+            request = json.loads(line)
+            request_id = request.get("id")
+            session_id = str(request["session"])
+            cmd = str(request["cmd"])
+        except (ValueError, KeyError, TypeError, AttributeError):
+            await write({"id": None, "error": "invalid request"})
+            return
+
+        try:
+            result = await self.execute(session_id, cmd)
+        except Exception as e:
+            await write({"id": request_id, "session": session_id, "error": str(e)})
+            return
+
+        await write({"id": request_id, "session": session_id, "result": result})
+
+    async def serve_stream(self, readline, write):
+        """
+        Reads request lines until the end of the stream, handling them concurrently.
+        """
+        tasks = set()
+
+        while line := await readline():
+            line = line.decode("utf-8").strip()
+            if not line:
+                continue
+
+            task = asyncio.create_task(self.handle_line(line, write))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+        if tasks:
+            await asyncio.gather(*tasks)
+
+    async def handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ):
+        async def write(response: dict):
+            writer.write((json.dumps(response) + "\n").encode("utf-8"))
+            await writer.drain()
+
+        try:
+            await self.serve_stream(reader.readline, write)
+        finally:
+            writer.close()
+
+    async def serve_stdio(self):
+        loop = asyncio.get_running_loop()
+
+        # A thread reads stdin, which works whether it is a pipe, a file or a terminal
+        def readline():
+            return loop.run_in_executor(None, sys.stdin.buffer.readline)
+
+        # Responses go to the real stdout, anything else printed is redirected to stderr by main()
+        async def write(response: dict):
+            sys.__stdout__.write(json.dumps(response) + "\n")
+            sys.__stdout__.flush()
+
+        await self.serve_stream(readline, write)
+
+    async def serve_unix(self, path: str):
+        server = await asyncio.start_unix_server(self.handle_connection, path)
+        async with server:
+            await server.serve_forever()
+
+    async def serve_tcp(self, host: str, port: int):
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        self.executor.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Serve UWI sessions over line-delimited JSON."
+    )
+    transport = parser.add_mutually_exclusive_group()
+    transport.add_argument(
+        "--stdio", action="store_true", help="serve stdin/stdout (default)"
+    )
+    transport.add_argument("--unix", metavar="PATH", help="serve a Unix socket")
+    transport.add_argument("--tcp", metavar="HOST:PORT", help="serve a TCP socket")
+    parser.add_argument(
+        "--workers", type=int, help="worker processes for guesses (default: cores)"
+    )
+    args = parser.parse_args()
+
+    with contextlib.redirect_stdout(sys.stderr):
+        server = UWIServer(args.workers)
+    try:
+        if args.unix:
+            print(f"{Fore.CYAN}Serving UWI on {args.unix}{Style.RESET_ALL}")
+            asyncio.run(server.serve_unix(args.unix))
+        elif args.tcp:
+            host, port = args.tcp.rsplit(":", 1)
+            print(f"{Fore.CYAN}Serving UWI on {host}:{port}{Style.RESET_ALL}")
+            asyncio.run(server.serve_tcp(host, int(port)))
+        else:
+            with contextlib.redirect_stdout(sys.stderr):
+                asyncio.run(server.serve_stdio())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+
+
+if __name__ == "__main__":
+    main()
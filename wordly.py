@@ -1,133 +1,229 @@
-from engine import Game, get_answer
+import engine
+from engine import Game, GameStats, get_answer
 from colorama import Fore, Style
+from collections import Counter
+import concurrent.futures
 import random
 import os
 import traceback
 import datetime
+import json
+import csv
+import io
+import queue
+import threading
+import time
 import requests
 
 
-def load_words(filename):
-    """Load words from a file, stripping any empty lines."""
-    with open(filename, "r") as f:
-        return [line.strip() for line in f if line.strip()]
-
+class ResultsSink:
+    """
+    Collects per-target results of a WSE run and writes them in batches from a background thread.
+
+    Results are written as JSON lines, or as CSV if the file name ends with .csv. Use it as a context
+    manager so the last batch is written when the run ends.
+    """
+
+    CSV_FIELDS = ("target", "guesses", "count", "seconds")
+
+    def __init__(self, path: str, batch_size: int = 256):
+        self.path = path
+        self.batch_size = batch_size
+        self.csv = path.endswith(".csv")
+        self.queue = queue.Queue()
+
+        self.file = open(path, "w", encoding="utf-8", newline="")
+        if self.csv:
+            csv.writer(self.file).writerow(self.CSV_FIELDS)
+
+        self.thread = threading.Thread(target=self.write_batches, daemon=True)
+        self.thread.start()
+
+    def add(self, target: str, guesses: list[str] | None, seconds: float):
+        """
+        Queues the result of one target.
+
+        Args:
+            target (str): The target word.
+            guesses (list[str] | None): The guesses played, or None if the engine failed.
+            seconds (float): The time spent solving the target.
+        """
+        self.queue.put((target, guesses, seconds))
+
+    def format_batch(self, batch: list[tuple]) -> str:
+        if self.csv:
+            out = io.StringIO()
+            writer = csv.writer(out)
+            for target, guesses, seconds in batch:
+                writer.writerow(
+                    (
+                        target,
+                        " ".join(guesses) if guesses else "",
+                        len(guesses) if guesses else "",
+                        f"{seconds:.6f}",
+                    )
+                )
+            return out.getvalue()
+
+        return "".join(
+            json.dumps(
+                {
+                    "target": target,
+                    "guesses": guesses,
+                    "count": len(guesses) if guesses else None,
+                    "seconds": seconds,
+                }
+            )
+            + "\n"
+            for target, guesses, seconds in batch
+        )
 
-def clear_screen():
-    """Clear the console screen."""
-    os.system("cls" if os.name == "nt" else "clear")
+    def write_batches(self):
+        """Writes queued results until close() queues None, a batch per write."""
+        done = False
+        while not done:
+            batch = [self.queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
 
+            if batch[-1] is None:
+                batch.pop()
+                done = True
+            if batch:
+                self.file.write(self.format_batch(batch))
+                self.file.flush()
 
-def display_word_test(target, total_guesses, total_games):
-    """Display the current word being tested with progress."""
-    clear_screen()
-    print(
-        f"{Fore.CYAN}Testing word: {Fore.YELLOW}{target} ({total_guesses / total_games * 100:.2f}%){Style.RESET_ALL}"
-    )
+    def close(self):
+        self.queue.put(None)
+        self.thread.join()
+        self.file.close()
 
+    def __enter__(self):
+        return self
 
-def simulate_game_for_all_targets(possible_guesses):
-    """Simulate games for all possible guesses and return the average guesses."""
-    total_guesses = 0
-    total_games = len(possible_guesses)
-    games_played = 0
+    def __exit__(self, *exc_info):
+        self.close()
 
-    for target in possible_guesses:
-        display_word_test(target, games_played, total_games)
 
-        game = Game()
+class ProgressLine:
+    """Reports progress on one line rewritten in place, at most once per interval."""
 
-        uwi = game.uwi_cmd("uwi")
-        if uwi is None or uwi != "uwi2ok":
-            print(
-                f"{Fore.RED}Error: Wordle Engine is not using UWIv2!{Style.RESET_ALL} Response: {uwi}"
-            )
-            return
+    def __init__(self, total: int, interval: float = 0.1):
+        self.total = total
+        self.interval = interval
+        self.last = 0.0
 
-        uwi = game.uwi_cmd("pos blank")
-        if uwi is None or uwi != "posok":
-            print(
-                f"{Fore.RED}Error: Wordle Engine did not recognize a blank position!{Style.RESET_ALL} Response: {uwi}"
-            )
+    def update(self, done: int, target: str | None = None):
+        now = time.monotonic()
+        if now - self.last < self.interval and done != self.total:
             return
+        self.last = now
 
-        starting_word = game.uwi_cmd("guess")
-        if starting_word is None or not starting_word.startswith("guessok\n"):
-            print(
-                f"{Fore.RED}Error: Wordle Engine did not recognize the guess command!{Style.RESET_ALL} Response: {starting_word}"
-            )
-            return
-        starting_word = starting_word[8:]
+        current = f" {Fore.YELLOW}{target}" if target else ""
+        print(
+            f"\r{Fore.CYAN}Tested {done}/{self.total} words ({done / self.total * 100 if self.total else 100:.2f}%){current}{Style.RESET_ALL}\033[K",
+            end="",
+            flush=True,
+        )
 
-        answer = get_answer(starting_word, target)
-        if answer is None:
-            print(
-                f"{Fore.RED}Error: Could not get answer for {starting_word} and {target}!"
+    def close(self):
+        print()
+
+
+def simulate_targets(targets):
+    """
+    Simulate a shard of targets in a worker process, solving them together in lockstep.
+
+    Returns:
+        tuple[list, GameStats, float]: The guesses played for each target, the statistics of the shard
+        and the time it took.
+    """
+    stats = GameStats()
+    start = time.perf_counter()
+    results = engine.solve_many(targets, settings={"stats": stats})
+    return list(results.items()), stats, time.perf_counter() - start
+
+
+def simulate_game_for_all_targets_parallel(
+    targets, workers=None, stats_file="wordly_stats.json", results_file="wordly.jsonl"
+):
+    """
+    Simulate games for all targets across a process pool.
+
+    Args:
+        targets (list[str]): The target words to play.
+        workers (int | None): The number of worker processes, defaulting to the number of cores.
+        stats_file (str | None): The file to write the timings and call counts of the run to as JSON, or None.
+        results_file (str): The file to write each target's guesses to, as JSON lines or as CSV if it
+            ends with .csv. Targets of a shard are solved together, so each gets an even share of its time.
+
+    Returns:
+        tuple[float | None, Counter, list[str]]: The average number of guesses (WSE, counting
+        failed targets as engine.FAILED_GUESSES), a histogram of guess counts and the targets the
+        engine failed to solve.
+    """
+    workers = workers or os.cpu_count() or 1
+
+    engine.preload_tables()
+
+    # Targets with the same first feedback share positions, so keep them in the same shard
+    starting_word = Game().starting_word
+    targets = sorted(targets, key=lambda target: get_answer(starting_word, target))
+
+    # Several shards per worker keep every worker busy until the end of the run
+    shard_size = max(1, len(targets) // (workers * 8))
+    shards = [targets[i : i + shard_size] for i in range(0, len(targets), shard_size)]
+
+    results = {}
+    stats = GameStats()
+    progress = ProgressLine(len(targets))
+    with ResultsSink(results_file) as sink, concurrent.futures.ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=engine.get_mp_context(),
+        initializer=engine.get_pattern_matrix,
+    ) as executor:
+        futures = [executor.submit(simulate_targets, shard) for shard in shards]
+        for future in concurrent.futures.as_completed(futures):
+            shard_results, shard_stats, seconds = future.result()
+            results.update(shard_results)
+            stats.merge(shard_stats)
+            for target, guesses in shard_results:
+                sink.add(target, guesses, seconds / len(shard_results))
+            progress.update(len(results))
+    progress.close()
+
+    histogram = Counter(len(guesses) for guesses in results.values() if guesses)
+    failed = [target for target in targets if results[target] is None]
+    solved = sum(histogram.values())
+    wse = engine.get_wse(results)
+
+    if stats_file:
+        with open(stats_file, "w") as f:
+            json.dump(
+                {
+                    "targets": len(targets),
+                    "solved": solved,
+                    "wse": wse,
+                    "workers": workers,
+                    **stats.to_dict(turns=False),
+                },
+                f,
+                indent=2,
             )
-            return
 
-        guess_count = 1  # Initial guess
+    return wse, histogram, failed
 
-        if answer == "ggggg":
-            with open("wordly.log", "a") as f:
-                f.write(f"{target} {guess_count}\n")
-        else:
-            current_pwn = starting_word + answer
 
-            pwn = game.uwi_cmd("pwn " + current_pwn)
-            if pwn is None or pwn != "pwnok":
-                print(
-                    f"{Fore.RED}Error: Wordle Engine did not recognize the pwn command!{Style.RESET_ALL} Response: {pwn}"
-                )
-                return
-
-            guess = None
-            answer = None
-
-            while True:
-                guess = game.uwi_cmd("guess")
-                if guess is None or not guess.startswith("guessok\n"):
-                    print(
-                        f"{Fore.RED}Error: Wordle Engine did not recognize the guess command!{Style.RESET_ALL} Response: {guess}"
-                    )
-                    return
-                guess = guess[8:]
-                if not guess:
-                    return
-
-                answer = get_answer(guess, target)
-                if answer is None:
-                    print(
-                        f"{Fore.RED}Error: Could not get answer for {guess} and {target}!"
-                    )
-                    return
-
-                current_pwn = current_pwn + "/" + guess + answer
-
-                pwn = game.uwi_cmd("pwn " + current_pwn)
-                if pwn is None or pwn != "pwnok":
-                    print(
-                        f"{Fore.RED}Error: Wordle Engine did not recognize the pwn command!{Style.RESET_ALL} Response: {pwn}"
-                    )
-                    return
-
-                if answer == "ggggg":
-                    with open("wordly.log", "a") as f:
-                        f.write(f"{target} {guess_count}\n")
-                    break
-
-                answer = get_answer(guess, target)
-                if answer is None:
-                    print(
-                        f"{Fore.RED}Error: Could not get answer for {guess} and {target}!"
-                    )
-                    return
-                guess_count += 1
-
-        total_guesses += guess_count
-        games_played += 1
-
-    return total_guesses / total_games
+def print_histogram(histogram):
+    """Print a histogram of guess counts."""
+    total = sum(histogram.values())
+    for count in sorted(histogram):
+        games = histogram[count]
+        bar = "#" * max(1, round(games / total * 50))
+        print(f"{Fore.YELLOW}{count:>3}{Style.RESET_ALL} {games:>5} {bar}")
 
 
 def play_game(target=None, max_guesses=5):
@@ -149,7 +245,7 @@ def play_game(target=None, max_guesses=5):
         return
 
     if target is None:
-        target = random.choice(load_words("answers.txt"))
+        target = random.choice(engine.answers)
         print(f"{Fore.YELLOW}Using random target: {Style.RESET_ALL}{target}")
 
     starting_word = game.uwi_cmd("guess")
@@ -227,7 +323,7 @@ def custom_mode(target=None):
     if not target:
         target = input(
             f"{Fore.BLUE}Enter target word: {Style.RESET_ALL}"
-        ) or random.choice(load_words("answers.txt"))
+        ) or random.choice(engine.answers)
     print(f"{Fore.YELLOW}Using target: {Style.RESET_ALL}{target}")
     max_guesses = int(
         input(
@@ -270,8 +366,16 @@ def main():
         custom_mode(response["solution"])
     elif mode == 3:
         print(f"{Fore.CYAN}Testing all possible answers...{Style.RESET_ALL}")
-        avg_guesses = simulate_game_for_all_targets(load_words("answers.txt"))
+        avg_guesses, histogram, failed = simulate_game_for_all_targets_parallel(
+            engine.answers
+        )
+        print_histogram(histogram)
+        if failed:
+            print(
+                f"{Fore.RED}Failed to solve {len(failed)} words, counted as {engine.FAILED_GUESSES} guesses (see 'wordly.jsonl'){Style.RESET_ALL}"
+            )
         print(f"{Fore.GREEN}Average guesses: {avg_guesses}{Style.RESET_ALL}")
+        print(f"{Fore.CYAN}Timings written to 'wordly_stats.json'{Style.RESET_ALL}")
     elif mode == 4:
         interactive_uwi()
 